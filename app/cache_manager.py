@@ -5,16 +5,51 @@ Implements aggressive caching for 50K RPM under $100/month
 import hashlib
 import json
 import logging
-from typing import Optional, Dict, Any, List
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Hashable
 
 import redis
 
 from app.config import settings as optimized_settings
-from app.utils import get_redis_client
+from app.utils import get_redis_client, json_dumps, json_loads
 
 logger = logging.getLogger(__name__)
 
 
+class LRUCache:
+    """Thread-safe in-process LRU cache - L0 tier in front of Redis"""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value and mark it as most recently used"""
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Cache a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
 class CacheManager:
     """Multi-level cache manager for aggressive optimization"""
     
@@ -47,7 +82,7 @@ class CacheManager:
                 self.cache_stats['hits'] += 1
                 self.cache_stats[f'{cache_type}_hits'] += 1
                 logger.debug("Cache hit for %s", key)
-                return json.loads(cached)
+                return json_loads(cached)
             self.cache_stats['misses'] += 1
             logger.debug("Cache miss for %s", key)
             return None
@@ -62,7 +97,7 @@ class CacheManager:
         
         try:
             ttl = self.cache_ttl.get(cache_type, optimized_settings.CACHE_TTL)
-            self.redis_client.setex(key, ttl, json.dumps(value))
+            self.redis_client.setex(key, ttl, json_dumps(value))
             logger.debug("Cached %s with TTL %d", key, ttl)
             return True
         except (redis.RedisError, TypeError) as e:
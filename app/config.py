@@ -37,7 +37,16 @@ class Settings(BaseSettings):
     # Model Settings
     MODEL_PATH: str = "./model"
     MODEL_MAX_LENGTH: int = 128
-    MODEL_NUM_BEAMS: int = 5
+    MODEL_NUM_BEAMS: int = 1  # Greedy decoding; raise for beam search
+    MODEL_DTYPE: str = "auto"  # auto: bfloat16 on GPU, float32 on CPU; "int8" quantizes on CPU
+    MODEL_COMPILE_CUDA_GRAPHS: bool = False  # torch.compile(mode="reduce-overhead") + static KV cache on GPU
+    MODEL_PAD_BUCKET: int = 32  # Pad inputs to a multiple of this so captured graphs are reused
+    MODEL_CPU_BF16: bool = False  # bfloat16 CPU inference (needs AVX-512 BF16 / AMX to pay off)
+    MODEL_BETTER_TRANSFORMER: bool = False  # Fused attention via optimum's BetterTransformer on CPU
+    MODEL_BATCH_SIZE: int = 16  # Sentences per padded generate() call
+    MODEL_CACHE_SIZE: int = 10000  # In-process corrected-text entries (Redis is the shared tier)
+    MODEL_ONNX_PATH: str = ""  # Set to serve via ONNX Runtime (exported here on first start)
+    MODEL_MAX_CONCURRENCY: int = 1  # OCR/generate calls run at once per process (forced to 1 with CUDA graphs)
     
     # OCR Settings
     OCR_LANGUAGES: list = ["en"]
@@ -50,6 +59,8 @@ class Settings(BaseSettings):
     ALLOWED_ARCHIVE_EXTENSIONS: list = [".zip"]
     MAX_ZIP_EXTRACT_SIZE: int = 50 * 1024 * 1024  # 50MB total extracted
     MAX_FILES_IN_ZIP: int = 100  # Maximum files to process from ZIP
+    MAX_ZIP_ENTRIES: int = 10000  # Archives listing more entries are rejected before extraction
+    MAX_ZIP_COMPRESSION_RATIO: float = 100.0  # Per-member uncompressed/compressed limit (zip bomb guard)
     CONTEXT_WORDS: int = 3
     
     # Cache Settings
@@ -5,15 +5,19 @@ Main API endpoints and application setup
 from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Form
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from celery.result import AsyncResult
 import logging
 import os
-from typing import Optional
+from typing import Dict, Optional
+from functools import lru_cache
 import time
 from contextlib import asynccontextmanager
 
 # Import custom middleware
-from app.middleware import RateLimitMiddleware, CircuitBreakerMiddleware, RequestTrackingMiddleware
+from app.middleware import (
+    RateLimitMiddleware, CircuitBreakerMiddleware, RequestTrackingMiddleware, UploadSizeLimitMiddleware
+)
 
 from app.config import settings
 from app.models import (
@@ -23,7 +27,7 @@ from app.models import (
 from app.tasks import process_grammar_correction
 from app.utils import (
     get_redis_client, compute_file_hash, get_cached_result,
-    set_cached_result, save_uploaded_file, cleanup_old_files
+    set_cached_result, cleanup_old_files, detect_file_type, UploadWriter
 )
 from app.processor import get_processor
 from app.universal_processor import get_universal_processor
@@ -36,6 +40,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Upload read size for the streaming size check in /process
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Allowed upload extensions mapped to the content type detect_file_type must report
+ALLOWED_EXTENSION_TYPES = {
+    **{ext.lower(): "image" for ext in settings.ALLOWED_IMAGE_EXTENSIONS},
+    **{ext.lower(): "html" for ext in settings.ALLOWED_HTML_EXTENSIONS},
+    **{ext.lower(): "archive" for ext in settings.ALLOWED_ARCHIVE_EXTENSIONS},
+}
+UNSUPPORTED_FILE_TYPE_DETAIL = f"Unsupported file type. Allowed: {', '.join(ALLOWED_EXTENSION_TYPES)}"
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -61,6 +76,13 @@ async def lifespan(app: FastAPI):
     except OSError as e:
         logger.error("Failed to create directories: %s", e)
     
+    # Load the model/OCR once and warm up generation before serving,
+    # so the first request does not pay for loading or kernel compilation
+    try:
+        get_universal_processor().processor.warmup()
+    except (RuntimeError, OSError) as e:
+        logger.warning("Model warm-up failed: %s", e)
+
     logger.info("Application started successfully")
     
     yield
@@ -92,6 +114,7 @@ app.add_middleware(
 app.add_middleware(RequestTrackingMiddleware)
 app.add_middleware(CircuitBreakerMiddleware, failure_threshold=5, timeout=60)
 app.add_middleware(RateLimitMiddleware, requests_per_minute=1000, burst=2000)
+app.add_middleware(UploadSizeLimitMiddleware, max_upload_size=settings.MAX_FILE_SIZE)
 
 
 @app.get("/", tags=["Root"])
@@ -105,6 +128,74 @@ async def root():
     }
 
 
+@lru_cache(maxsize=1)
+def check_capabilities() -> Dict[str, bool]:
+    """
+    Check which optional processing libraries work. Installed libraries do not change
+    while the process runs, so the result is computed on the first health check and reused.
+    """
+    ocr_available = False
+    beautifulsoup_available = False
+    image_reconstruction_available = False
+    html_reconstruction_available = False
+    
+    # Check OCR availability
+    try:
+        import easyocr
+        ocr_available = True
+    except ImportError:
+        ocr_available = False
+    except (OSError, RuntimeError):
+        ocr_available = False
+
+    # Check BeautifulSoup availability
+    try:
+        from bs4 import BeautifulSoup
+        # Test with a simple HTML string
+        soup = BeautifulSoup("<html><body>test</body></html>", 'html.parser')
+        beautifulsoup_available = True
+    except ImportError:
+        beautifulsoup_available = False
+    except (ValueError, AttributeError):
+        beautifulsoup_available = False
+
+    # Check image reconstruction capabilities
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+        import cv2
+        import numpy as np
+        # Test basic image operations
+        test_img = Image.new('RGB', (100, 100), color='white')
+        test_array = np.array(test_img)
+        image_reconstruction_available = True
+    except ImportError:
+        image_reconstruction_available = False
+    except (OSError, ValueError):
+        image_reconstruction_available = False
+
+    # Check HTML reconstruction capabilities
+    try:
+        from bs4 import BeautifulSoup
+        from difflib import Differ
+        # Test HTML parsing and text extraction
+        test_html = "<html><body><p>Test content</p></body></html>"
+        soup = BeautifulSoup(test_html, 'html.parser')
+        text = soup.get_text()
+        differ = Differ()
+        html_reconstruction_available = True
+    except ImportError:
+        html_reconstruction_available = False
+    except (ValueError, AttributeError):
+        html_reconstruction_available = False
+
+    return {
+        "ocr_available": ocr_available,
+        "beautifulsoup_available": beautifulsoup_available,
+        "image_reconstruction_available": image_reconstruction_available,
+        "html_reconstruction_available": html_reconstruction_available
+    }
+
+
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
     """Health check endpoint"""
@@ -117,78 +208,21 @@ async def health_check():
     except (ConnectionError, AttributeError) as e:
         logger.debug("Redis health check failed: %s", e)
     
-    # Check if processor can be initialized
+    # Check if model path exists and is valid
     model_loaded = False
-    ocr_available = False
-    beautifulsoup_available = False
-    image_reconstruction_available = False
-    html_reconstruction_available = False
-    
     try:
-        # Check if model path exists and is valid
         model_loaded = os.path.exists(settings.MODEL_PATH) and os.path.exists(os.path.join(settings.MODEL_PATH, "config.json"))
-        
-        # Check OCR availability
-        try:
-            import easyocr
-            ocr_available = True
-        except ImportError:
-            ocr_available = False
-        except (OSError, RuntimeError):
-            ocr_available = False
-
-        # Check BeautifulSoup availability
-        try:
-            from bs4 import BeautifulSoup
-            # Test with a simple HTML string
-            soup = BeautifulSoup("<html><body>test</body></html>", 'html.parser')
-            beautifulsoup_available = True
-        except ImportError:
-            beautifulsoup_available = False
-        except (ValueError, AttributeError):
-            beautifulsoup_available = False
-
-        # Check image reconstruction capabilities
-        try:
-            from PIL import Image, ImageDraw, ImageFont
-            import cv2
-            import numpy as np
-            # Test basic image operations
-            test_img = Image.new('RGB', (100, 100), color='white')
-            test_array = np.array(test_img)
-            image_reconstruction_available = True
-        except ImportError:
-            image_reconstruction_available = False
-        except (OSError, ValueError):
-            image_reconstruction_available = False
-
-        # Check HTML reconstruction capabilities
-        try:
-            from bs4 import BeautifulSoup
-            from difflib import Differ
-            # Test HTML parsing and text extraction
-            test_html = "<html><body><p>Test content</p></body></html>"
-            soup = BeautifulSoup(test_html, 'html.parser')
-            text = soup.get_text()
-            differ = Differ()
-            html_reconstruction_available = True
-        except ImportError:
-            html_reconstruction_available = False
-        except (ValueError, AttributeError):
-            html_reconstruction_available = False
-
-    except (OSError, ImportError) as e:
-        logger.debug("Model/OCR health check failed: %s", e)
+    except OSError as e:
+        logger.debug("Model health check failed: %s", e)
+    
+    capabilities = check_capabilities()
     
     return HealthResponse(
         status="healthy" if redis_connected and model_loaded else "degraded",
         version=settings.APP_VERSION,
         redis_connected=redis_connected,
         grammar_model_loaded=model_loaded,
-        ocr_available=ocr_available,
-        beautifulsoup_available=beautifulsoup_available,
-        image_reconstruction_available=image_reconstruction_available,
-        html_reconstruction_available=html_reconstruction_available
+        **capabilities
     )
 
 
@@ -211,29 +245,41 @@ async def process_file(
         # Validate file extension
         file_extension = os.path.splitext(file.filename)[1].lower()
         
-        allowed_extensions = (
-            settings.ALLOWED_IMAGE_EXTENSIONS + 
-            settings.ALLOWED_HTML_EXTENSIONS + 
-            settings.ALLOWED_ARCHIVE_EXTENSIONS
-        )
-        if file_extension not in allowed_extensions:
+        expected_type = ALLOWED_EXTENSION_TYPES.get(file_extension)
+        if expected_type is None:
             raise HTTPException(
                 status_code=400,
-                detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}"
+                detail=UNSUPPORTED_FILE_TYPE_DETAIL
             )
         
-        # Read file content
-        file_content = await file.read()
-        
-        # Check file size
-        if len(file_content) > settings.MAX_FILE_SIZE:
+        # Check the content signature on the first chunk, before buffering the rest
+        first_chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if detect_file_type(first_chunk) != expected_type:
             raise HTTPException(
                 status_code=400,
-                detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE / (1024*1024)}MB"
+                detail=f"File content does not match its {file_extension} extension"
             )
         
-        # Save uploaded file
-        file_path = save_uploaded_file(file_content, file.filename)
+        # Stream file content straight into the uploads directory, stopping as soon as the
+        # size limit is exceeded (a rejected partial upload is removed). File creation, writes,
+        # hashing and the final rename run in the threadpool so they never block the event loop
+        upload = await run_in_threadpool(UploadWriter, "/tmp/uploads")
+        try:
+            chunk = first_chunk
+            while chunk:
+                # Check file size
+                if upload.size + len(chunk) > settings.MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE / (1024*1024)}MB"
+                    )
+                await run_in_threadpool(upload.write, chunk)
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            
+            # Save uploaded file
+            file_path = await run_in_threadpool(upload.commit, file.filename)
+        finally:
+            await run_in_threadpool(upload.close)
         
         # Schedule cleanup
         background_tasks.add_task(cleanup_old_files, "/tmp/uploads", 3600)
@@ -243,7 +289,12 @@ async def process_file(
         logger.info("Processing %s with universal processor (async_processing=%s ignored)", file.filename, async_processing)
         
         universal_processor = get_universal_processor()
-        result = universal_processor.process_any_input(file_path, output_dir="/tmp/outputs")
+        # OCR and model inference are blocking; running them in the threadpool keeps
+        # the event loop free to accept and reject other requests meanwhile. The processor
+        # itself limits how many of them reach the model at once (MODEL_MAX_CONCURRENCY)
+        result = await run_in_threadpool(
+            universal_processor.process_any_input, file_path, output_dir="/tmp/outputs"
+        )
         
         # Add performance stats to response
         stats = universal_processor.get_performance_stats()
@@ -4,6 +4,7 @@ Middleware for Rate Limiting, Circuit Breaker, and Request Tracking
 import time
 import logging
 from fastapi import Request, HTTPException
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from collections import defaultdict
 from datetime import datetime, timedelta
@@ -133,6 +134,31 @@ class CircuitBreakerMiddleware(BaseHTTPMiddleware):
             )
 
 
+class UploadSizeLimitMiddleware(BaseHTTPMiddleware):
+    """Reject oversized uploads from the Content-Length header, before the body is read"""
+
+    # Allowance for the multipart boundaries and form fields around the file itself
+    MULTIPART_OVERHEAD = 64 * 1024
+
+    def __init__(self, app, max_upload_size: int):
+        super().__init__(app)
+        self.max_upload_size = max_upload_size
+        self.max_body_size = max_upload_size + self.MULTIPART_OVERHEAD
+
+    async def dispatch(self, request: Request, call_next):
+        content_length = request.headers.get("content-length")
+        if request.method == "POST" and content_length and content_length.isdigit():
+            if int(content_length) > self.max_body_size:
+                logger.warning("Upload rejected: Content-Length %s exceeds limit", content_length)
+                # Same status and detail as the streaming size check in /process
+                return JSONResponse(
+                    status_code=400,
+                    content={"detail": f"File too large. Maximum size: {self.max_upload_size / (1024*1024)}MB"}
+                )
+
+        return await call_next(request)
+
+
 class RequestTrackingMiddleware(BaseHTTPMiddleware):
     """Track request metrics for monitoring"""
     
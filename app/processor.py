@@ -3,22 +3,418 @@ Fixed Grammar Correction Processor
 All indentation and syntax errors resolved
 """
 import os
-import json
 import re
+import hashlib
+import threading
 import time
-import base64
+from array import array
+from html.parser import HTMLParser
+from contextlib import nullcontext
 from io import BytesIO
 from bs4 import BeautifulSoup
-from PIL import Image, ImageDraw
+from PIL import Image
 from typing import Tuple, List, Dict, Optional, Any
 import logging
+import cv2
+import numpy as np
 import torch
 
+from app.cache_manager import LRUCache, get_cache_manager
 from app.config import settings
-from app.robust_model_loader import load_robust_model, test_model_inference
+from app.robust_model_loader import load_robust_model, load_onnx_model, test_model_inference
+from app.utils import detect_file_type, json_dumps
+
+try:
+    from lxml import etree
+    # libxml2-backed tree builder; several times faster than the pure-Python html.parser
+    _HTML_PARSER = 'lxml'
+except ImportError:
+    etree = None
+    _HTML_PARSER = 'html.parser'
+
+try:
+    from pybase64 import b64encode
+except ImportError:  # Optional SIMD codec; stdlib base64 otherwise
+    from base64 import b64encode
 
 logger = logging.getLogger(__name__)
 
+# Resolve the inference device once at import time instead of on every call
+DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+# Splits text into word tokens and the separators between them
+_TOKEN_RE = re.compile(r'(\b\w+\b|\W+)')
+
+# Sentence boundaries: whitespace following terminal punctuation
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+# Word diffs needing more edits than this fall back to a single whole-replace hunk
+_MAX_EDIT_DISTANCE = 500
+
+# Normalized edit distance at or below which two words in an uneven hunk count as the same word edited
+_SIMILAR_WORD_DISTANCE = 0.5
+
+# Whitespace collapsing for extracted HTML text and the HTML output string
+_WHITESPACE_RE = re.compile(r'\s+')
+_BETWEEN_TAGS_RE = re.compile(r'>\s*<')
+
+# HTML elements whose text is extracted for correction: each block element is one line,
+# inline elements only form their own line when they are not inside a block
+_HTML_BLOCK_TAGS = frozenset(('p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'div', 'li'))
+_HTML_INLINE_TAGS = frozenset(('span', 'a', 'strong', 'em', 'b', 'i'))
+
+# Elements BeautifulSoup's html.parser builder closes as soon as they open
+_HTML_VOID_TAGS = frozenset((
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr', 'image',
+    'img', 'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid', 'param', 'source',
+    'spacer', 'track', 'wbr',
+))
+
+
+class _HTMLTextCollector:
+    """
+    Parser-event sink that groups text fragments by their owning element without building a tree.
+    A fragment belongs to its nearest block ancestor, or to its outermost inline one when it is
+    not inside a block; script/style text is skipped. Only text inside the first <body> counts
+    when the document has one. This is the same selection the soup walk made, so fed the events
+    of the soup's own tree builder it yields the same lines.
+    """
+
+    def __init__(self):
+        self._stack = []  # (tag, element id) of the open elements
+        self._next_id = 0
+        self._body_id = None
+        self._body_blocks = {}
+        self._all_blocks = {}
+
+    def start(self, tag, attrib=None, nsmap=None):  # pylint: disable=unused-argument
+        """Open an element (lxml parser target interface)"""
+        if tag == 'body' and self._body_id is None:
+            self._body_id = self._next_id
+        self._stack.append((tag, self._next_id))
+        self._next_id += 1
+
+    def end(self, tag):
+        """Close the most recently opened element with this tag, and everything opened inside it"""
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                del self._stack[index:]
+                return
+
+    def data(self, data):
+        """Assign a text fragment to its owning element"""
+        if not self._stack or self._stack[-1][0] in ('script', 'style'):
+            return
+        owner = None
+        for tag, element_id in reversed(self._stack):
+            if tag in _HTML_BLOCK_TAGS:
+                owner = element_id
+                break
+            if tag in _HTML_INLINE_TAGS:
+                owner = element_id
+        if owner is None:
+            return
+        self._all_blocks.setdefault(owner, []).append(data)
+        if self._body_id is not None and any(element_id == self._body_id for _, element_id in self._stack):
+            self._body_blocks.setdefault(owner, []).append(data)
+
+    def close(self) -> Dict[int, List[str]]:
+        """Text fragments per owning element, in order of first appearance"""
+        return self._body_blocks if self._body_id is not None else self._all_blocks
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """Feeds html.parser events to a _HTMLTextCollector the way BeautifulSoup's html.parser builder nests them"""
+
+    def __init__(self, collector: _HTMLTextCollector):
+        super().__init__(convert_charrefs=True)
+        self._collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self._collector.start(tag)
+        if tag in _HTML_VOID_TAGS:
+            self._collector.end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._collector.start(tag)
+        self._collector.end(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in _HTML_VOID_TAGS:
+            self._collector.end(tag)
+
+    def handle_data(self, data):
+        self._collector.data(data)
+
+
+def _extract_html_blocks(content: str) -> Dict[int, List[str]]:
+    """Text fragments of an HTML document grouped per owning element, from one streaming parse"""
+    collector = _HTMLTextCollector()
+    if etree is not None:
+        # libxml2 drives the collector directly (its implied <head>/<body> and tag closing
+        # are the tree the lxml soup would have had), so no tree is built
+        parser = etree.HTMLParser(target=collector, recover=True, strip_cdata=False)
+        try:
+            parser.feed(content)
+            return parser.close()
+        except etree.LxmlError:
+            return {}
+    extractor = _HTMLTextExtractor(collector)
+    extractor.feed(content)
+    extractor.close()
+    return collector.close()
+
+
+def _extract_html_text(content: str) -> str:
+    """Text to correct from an HTML document: one line per owning element, whitespace collapsed"""
+    parts = []
+    for pieces in _extract_html_blocks(content).values():
+        block_text = _WHITESPACE_RE.sub(' ', "".join(pieces)).strip()
+        if block_text:  # Only process elements with actual text
+            parts.append(block_text)
+
+    if parts:
+        return "\n".join(parts) + "\n"
+    return BeautifulSoup(content, _HTML_PARSER).get_text()
+
+
+# Rule-based corrections used when the model is unavailable or changes nothing
+_FALLBACK_PATTERNS = {
+    # Common spelling mistakes
+    r'\bgrammer\b': 'grammar',
+    r'\bteh\b': 'the',
+    r'\badn\b': 'and',
+    r'\bthier\b': 'their',
+    r'\brecieve\b': 'receive',
+    r'\boccured\b': 'occurred',
+    r'\bseperate\b': 'separate',
+    r'\bdefinately\b': 'definitely',
+
+    # Contractions
+    r'\bdont\b': "don't",
+    r'\bwont\b': "won't",
+    r'\bcant\b': "can't",
+    r'\bdoesnt\b': "doesn't",
+    r'\bdidnt\b': "didn't",
+    r'\bhavent\b': "haven't",
+    r'\bhasnt\b': "hasn't",
+    r'\bhadnt\b': "hadn't",
+    r'\bisnt\b': "isn't",
+    r'\bwasnt\b': "wasn't",
+    r'\bwerent\b': "weren't",
+    r'\bwouldnt\b': "wouldn't",
+    r'\bcouldnt\b': "couldn't",
+    r'\bshouldnt\b': "shouldn't",
+
+    # OCR common mistakes (letter confusions)
+    r'\b0\b': 'O',  # Zero confused with letter O
+    r'\bl\b(?=[A-Z])': 'I',  # lowercase L confused with I
+    r'\brn\b': 'm',  # rn confused with m
+    r'\bvv\b': 'w',  # vv confused with w
+}
+_FALLBACK_RULES = [(re.compile(pattern, re.IGNORECASE), replacement) for pattern, replacement in _FALLBACK_PATTERNS.items()]
+
+
+def _to_device(tensor: torch.Tensor) -> torch.Tensor:
+    """Move a CPU tensor to DEVICE without blocking the host on CUDA"""
+    if DEVICE.type == "cuda":
+        # No pin_memory(): for token-id batches this small, the extra pinned host copy
+        # costs more than the asynchronous transfer saves
+        return tensor.to(DEVICE, non_blocking=True)
+    return tensor
+
+
+def _is_word(token: str) -> bool:
+    """Check whether a _TOKEN_RE token is a word (same as \\w: alphanumerics plus underscore)"""
+    first = token[0]
+    return first.isalnum() or first == '_'
+
+
+def _myers_diff(a: List[str], b: List[str], a_lo: int = 0, a_hi: Optional[int] = None,
+                b_lo: int = 0, b_hi: Optional[int] = None,
+                max_edits: Optional[int] = None) -> Optional[List[Tuple[str, int, int]]]:
+    """
+    Shortest edit script from a[a_lo:a_hi] to b[b_lo:b_hi] (Myers 1986, greedy forward variant).
+    Returns (op, a_index, b_index) tuples, op being '=' (keep), '-' (delete) or '+' (insert);
+    indices refer to the full lists, so callers can diff a window without slicing copies.
+    Returns None when more than max_edits edits would be needed.
+    """
+    a_hi = len(a) if a_hi is None else a_hi
+    b_hi = len(b) if b_hi is None else b_hi
+    n, m = a_hi - a_lo, b_hi - b_lo
+    max_d = n + m
+    if max_edits is not None and max_edits < max_d:
+        max_d = max_edits
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+
+    # V after round d (diagonals -d..d) is appended to one flat array at base d*d,
+    # so no per-round snapshot list is allocated
+    trace = array('i')
+
+    # Forward pass: furthest-reaching x on each diagonal k = x - y, one round per edit
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                break
+        else:
+            trace.extend(v[offset - d:offset + d + 1])
+            continue
+        break
+    else:
+        # Edit budget exhausted without reaching (n, m)
+        return None
+
+    # Backtrack from (n, m) to (0, 0), reading round d - 1 from the flat trace
+    edit_count = d
+    ops = []
+    x, y = n, m
+    for d in range(edit_count, 0, -1):
+        k = x - y
+        center = (d - 1) * d  # index of diagonal 0 in round d - 1
+        if k == -d or (k != d and trace[center + k - 1] < trace[center + k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = trace[center + prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            ops.append(('=', a_lo + x, b_lo + y))
+        if x == prev_x:
+            ops.append(('+', a_lo + prev_x, b_lo + prev_y))
+        else:
+            ops.append(('-', a_lo + prev_x, b_lo + prev_y))
+        x, y = prev_x, prev_y
+
+    # Round 0 is a single snake from the origin
+    while x > 0:
+        x -= 1
+        y -= 1
+        ops.append(('=', a_lo + x, b_lo + y))
+
+    ops.reverse()
+    return ops
+
+
+def _diff_hunks(a: List[str], b: List[str]) -> List[Tuple[int, int, int, int]]:
+    """Group a Myers edit script into changed (a_start, a_end, b_start, b_end) ranges"""
+    # Corrections are local: diff only what lies between the common prefix and suffix,
+    # tracked as index pointers into the original lists
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    a_hi, b_hi = len(a), len(b)
+    while a_hi > prefix and b_hi > prefix and a[a_hi - 1] == b[b_hi - 1]:
+        a_hi -= 1
+        b_hi -= 1
+
+    # Nothing left on one side: the whole middle is a single insertion or deletion
+    if a_hi == prefix or b_hi == prefix:
+        return [(prefix, a_hi, prefix, b_hi)] if a_hi > prefix or b_hi > prefix else []
+
+    # Single-word swap, the typical grammar fix ("are" -> "is"): one hunk, no edit-graph search
+    if a_hi - prefix == 1 and b_hi - prefix == 1:
+        return [(prefix, a_hi, prefix, b_hi)]
+
+    # Heavy rewrites would cost O(N * D); past the cap the middle is one whole-replace hunk
+    ops = _myers_diff(a, b, prefix, a_hi, prefix, b_hi, max_edits=_MAX_EDIT_DISTANCE)
+    if ops is None:
+        return [(prefix, a_hi, prefix, b_hi)]
+
+    hunks = []
+    current = None
+    for op, i, j in ops:
+        if op == '=':
+            if current is not None:
+                hunks.append(tuple(current))
+                current = None
+            continue
+        if current is None:
+            current = [i, i, j, j]
+        if op == '-':
+            current[1] = i + 1
+        else:
+            current[3] = j + 1
+    if current is not None:
+        hunks.append(tuple(current))
+    return hunks
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """
+    Levenshtein distance with Myers' bit-parallel algorithm (Myers 1999 / Hyyro).
+    Each DP column is packed into a Python int, so the cost is O(len(a)) big-int ops.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if m == 0:
+        return len(a)
+
+    # Equality masks: bit i of peq[c] is set where b[i] == c
+    peq = {}
+    for i, char in enumerate(b):
+        peq[char] = peq.get(char, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for char in a:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        score += ((ph & high) != 0) - ((mh & high) != 0)
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return score
+
+
+def _pair_hunk_words(a_words: List[str], b_words: List[str]) -> List[Tuple[int, int]]:
+    """
+    Pair replaced words inside one hunk as (a_offset, b_offset).
+    Words pair in order by position; in uneven hunks a word of the shorter side only skips ahead
+    (treating the skipped words as insertions/deletions) to a clearly similar word, e.g. the
+    'recieved' in 'recieved' -> 'has received' pairs with 'received', not 'has'.
+    """
+    n, m = len(a_words), len(b_words)
+    if n == m or not n or not m or n * m > 1024:
+        return [(k, k) for k in range(min(n, m))]
+
+    swapped = n > m
+    short, long_ = (b_words, a_words) if swapped else (a_words, b_words)
+    s_len, l_len = len(short), len(long_)
+
+    pairs = []
+    j = 0
+    for i, word in enumerate(short):
+        # Leave enough long-side words for the short-side words still to pair
+        last = l_len - (s_len - i)
+        match = j
+        for k in range(j, last + 1):
+            other = long_[k]
+            if _edit_distance(word, other) / max(len(word), len(other)) <= _SIMILAR_WORD_DISTANCE:
+                match = k
+                break
+        pairs.append((i, match))
+        j = match + 1
+    return [(l, s) for s, l in pairs] if swapped else pairs
+
 
 class GrammarCorrectionProcessor:
     """Fixed grammar correction processor with singleton pattern"""
@@ -39,6 +435,18 @@ class GrammarCorrectionProcessor:
         self.model = None
         self.tokenizer = None
         self.ocr_reader = None
+        # Identifies the loaded weights/backend; part of every correction cache key
+        self.model_version = "fallback"
+        # Extra tokenizer/generate arguments set by _optimize_model()
+        self.tokenize_kwargs = {}
+        self.generate_kwargs = {}
+        self.autocast_dtype = None
+        # Corrected text per input (L0, in-process); Redis is the shared tier behind it
+        self._correction_cache = LRUCache(settings.MODEL_CACHE_SIZE)
+        # Bounds concurrent OCR/generate calls from the request threadpool; captured CUDA graphs
+        # and the static KV cache are shared state, so that path always runs one call at a time
+        inference_slots = 1 if settings.MODEL_COMPILE_CUDA_GRAPHS else max(1, settings.MODEL_MAX_CONCURRENCY)
+        self._inference_slots = threading.BoundedSemaphore(inference_slots)
         self._load_model()
         self._initialize_ocr()
 
@@ -56,12 +464,32 @@ class GrammarCorrectionProcessor:
                 model_info = get_model_info(settings.MODEL_PATH)
                 logger.info("Model info: %s", model_info)
 
+                # Prefer the ONNX Runtime backend when configured; PyTorch otherwise
+                is_onnx = False
+                if settings.MODEL_ONNX_PATH:
+                    self.model, self.tokenizer = load_onnx_model(
+                        settings.MODEL_PATH, settings.MODEL_ONNX_PATH, use_cuda=DEVICE.type == "cuda"
+                    )
+                    is_onnx = self.model is not None and self.tokenizer is not None
+
                 # Try to load with ultimate robust loader
-                self.model, self.tokenizer = load_robust_model(settings.MODEL_PATH)
+                if not is_onnx:
+                    self.model, self.tokenizer = load_robust_model(settings.MODEL_PATH)
 
-                if self.model is not None and self.tokenizer is not None:
+                if self.model is not None and self.tokenizer is not None and not is_onnx:
                     logger.info(" Model loaded successfully with ultimate robust loader")
 
+                    # Move the model to the inference device once, not per request
+                    self.model.to(DEVICE)
+                    self.model.eval()
+                    # Checkpoints saved with use_cache=false recompute decoder attention every step
+                    self.model.config.use_cache = True
+                    logger.info(" Model placed on device: %s", DEVICE)
+                    self._optimize_model()
+
+                if self.model is not None and self.tokenizer is not None:
+                    self.model_version = self._compute_model_version("onnx" if is_onnx else "torch")
+
                     # Test the model with a simple inference
                     try:
                         test_result = test_model_inference(self.model, self.tokenizer, "This is a test.")
@@ -72,6 +500,7 @@ class GrammarCorrectionProcessor:
                     logger.warning(" Model loading failed, using fallback")
                     self.model = None
                     self.tokenizer = None
+                    self.model_version = "fallback"
             if not os.path.exists(settings.MODEL_PATH):
                 logger.warning(" Model path not found: %s", settings.MODEL_PATH)
                 self.model = None
@@ -81,11 +510,70 @@ class GrammarCorrectionProcessor:
             self.model = None
             self.tokenizer = None
 
+    def _compute_model_version(self, backend: str) -> str:
+        """Short fingerprint of the model config and serving backend, so retrained weights never hit stale cache entries"""
+        version_hash = hashlib.blake2b(f"{backend}:{settings.MODEL_DTYPE}".encode('utf-8'), digest_size=8)
+        for filename in ("config.json", "generation_config.json"):
+            try:
+                with open(os.path.join(settings.MODEL_PATH, filename), 'rb') as f:
+                    version_hash.update(f.read())
+            except OSError:
+                continue
+        try:
+            # Weights file timestamps catch retrains that keep the same config
+            for entry in sorted(os.scandir(settings.MODEL_PATH), key=lambda e: e.name):
+                if entry.name.endswith((".bin", ".safetensors")):
+                    version_hash.update(f"{entry.name}:{entry.stat().st_mtime_ns}".encode('utf-8'))
+        except OSError:
+            pass
+        return f"{backend}-{version_hash.hexdigest()}"
+
+    def _optimize_model(self):
+        """Apply device-specific inference optimizations to the loaded model"""
+        # Weight precision first, so later steps compile/optimize the final dtype
+        model_dtype = settings.MODEL_DTYPE.lower()
+        if DEVICE.type == "cuda" and model_dtype in ("auto", "bfloat16") and torch.cuda.is_bf16_supported():
+            self.model.to(dtype=torch.bfloat16)
+            logger.info(" Model weights cast to bfloat16")
+        elif DEVICE.type == "cpu" and model_dtype == "int8":
+            try:
+                self.model = torch.ao.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                logger.info(" Model linear layers quantized to int8")
+            except (RuntimeError, AttributeError) as e:
+                logger.warning("int8 quantization unavailable, keeping float32: %s", e)
+
+        if DEVICE.type == "cpu" and settings.MODEL_BETTER_TRANSFORMER:
+            try:
+                from optimum.bettertransformer import BetterTransformer  # pylint: disable=import-outside-toplevel
+                self.model = BetterTransformer.transform(self.model)
+                logger.info(" BetterTransformer fused attention enabled")
+            except (ImportError, ValueError, NotImplementedError) as e:
+                logger.warning("BetterTransformer not applied: %s", e)
+
+        if DEVICE.type == "cpu" and settings.MODEL_CPU_BF16:
+            try:
+                import intel_extension_for_pytorch as ipex  # pylint: disable=import-outside-toplevel
+                self.model = ipex.optimize(self.model, dtype=torch.bfloat16)
+                logger.info(" Model optimized with IPEX for bfloat16")
+            except (ImportError, RuntimeError) as e:
+                logger.info("IPEX not available, using plain bfloat16 autocast: %s", e)
+            self.autocast_dtype = torch.bfloat16
+
+    def _autocast(self):
+        """Autocast context for generation when a reduced-precision dtype is configured"""
+        if self.autocast_dtype is None:
+            return nullcontext()
+        return torch.autocast(device_type=DEVICE.type, dtype=self.autocast_dtype)
+
     def _initialize_ocr(self):
         """Initialize OCR reader for text extraction from images"""
         try:
             import easyocr  # pylint: disable=import-outside-toplevel
-            self.ocr_reader = easyocr.Reader(['en'])
+            self.ocr_reader = easyocr.Reader(
+                ['en'], gpu=DEVICE.type == "cuda", cudnn_benchmark=True
+            )
             logger.info("OCR initialized")
         except (ImportError, OSError, RuntimeError) as e:
             logger.warning("OCR not available: %s", e)
@@ -115,6 +603,16 @@ class GrammarCorrectionProcessor:
         file_extension = os.path.splitext(input_source_path)[1].lower()
 
         if file_extension in settings.ALLOWED_IMAGE_EXTENSIONS:
+            # Check the signature before any decode/OCR work (also covers images inside ZIPs)
+            try:
+                with open(input_source_path, 'rb') as f:
+                    header = f.read(16)
+            except OSError as e:
+                logger.error("Error reading image file %s: %s", input_source_path, e)
+                return None, 'file_read_error'
+            if detect_file_type(header) != 'image':
+                logger.warning("Not a PNG/JPEG image: %s", input_source_path)
+                return None, 'corrupt_image'
             return input_source_path, 'image'
         if file_extension in settings.ALLOWED_HTML_EXTENSIONS:
             # Try multiple encodings to handle different file formats
@@ -153,12 +651,39 @@ class GrammarCorrectionProcessor:
         logger.error("Unsupported file type: %s", file_extension)
         return None, 'unknown_file_type'
 
+    def _load_image(self, image_path: str) -> Optional[np.ndarray]:
+        """Decode an image file into an RGB array for OCR or highlighting"""
+        try:
+            # One read of the raw bytes and one native decode; orientation is left as stored, like PIL
+            buffer = np.fromfile(image_path, dtype=np.uint8)
+            image = cv2.imdecode(buffer, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+        except (OSError, IOError, ValueError, cv2.error) as e:
+            logger.error("Error decoding image %s: %s", image_path, e)
+            return None
+        if image is None:
+            logger.error("Error decoding image %s: unsupported or corrupt data", image_path)
+            return None
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    def _to_rgb_array(self, image: Any) -> np.ndarray:
+        """Return a writable RGB array copy of a decoded image, or decode it if given a path"""
+        if isinstance(image, np.ndarray):
+            return image.copy()
+        with Image.open(image) as img:
+            return np.array(img.convert("RGB"))
+
+    def _to_pil_image(self, image: Any) -> Image.Image:
+        """Return a PIL copy of a decoded RGB array, or open the image if given a path"""
+        if isinstance(image, np.ndarray):
+            return Image.fromarray(image)
+        return Image.open(image).convert("RGB")
+
     def extract_text(self, content: Any, input_type: str) -> Tuple[Any, Any]:
         """
         Extract text from image or HTML content.
 
         Args:
-            content: Image path (str) or HTML content (str)
+            content: Image path (str) or decoded RGB array for images, HTML content (str) for HTML
             input_type: Type of input ('image' or 'html')
 
         Returns:
@@ -170,7 +695,8 @@ class GrammarCorrectionProcessor:
                 return [], []
 
             try:
-                results = self.ocr_reader.readtext(content)
+                with self._inference_slots:
+                    results = self.ocr_reader.readtext(content)
                 extracted_texts = [item[1] for item in results]
                 return extracted_texts, results
             except (OSError, ValueError, AttributeError) as e:
@@ -178,128 +704,191 @@ class GrammarCorrectionProcessor:
                 return [], []
 
         if input_type == 'html':
-            # For HTML, we need to preserve the structure while extracting text for correction
-            soup = BeautifulSoup(content, 'html.parser')
+            # Extract the text for correction in one streaming pass, without building a tree;
+            # the soup is only parsed later if there are corrections to highlight.
+            # Return both the extracted text and the original HTML for reconstruction
+            return _extract_html_text(content), content
 
-            # Extract text content for grammar correction while preserving HTML structure
-            extracted_text = ""
-            text_elements = []
+        return None, None
 
-            # Find all text-containing elements
-            for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'div', 'li', 'span', 'a', 'strong', 'em', 'b', 'i']):
-                if element.get_text().strip():  # Only process elements with actual text
-                    text_elements.append(element)
-                    extracted_text += element.get_text() + "\n"
+    def correct_grammar(self, text: str, num_beams: Optional[int] = None) -> str:
+        """Correct grammar, serving repeated texts from the in-process (L0) and Redis caches"""
+        return self._correct_cached([text], num_beams)[0]
 
-            if not extracted_text:
-                extracted_text = soup.get_text()
+    def correct_grammar_batch(self, texts: List[str]) -> List[str]:
+        """
+        Correct a list of texts sentence by sentence. Each distinct sentence is corrected once,
+        so a re-processed document only pays for the sentences that changed (the rest are cache hits).
+        """
+        sentences_per_text = [_SENTENCE_SPLIT_RE.split(t.strip()) if t.strip() else [] for t in texts]
+        unique = list(dict.fromkeys(sentence for sentences in sentences_per_text for sentence in sentences))
+        mapping = dict(zip(unique, self._correct_cached(unique)))
+        return [
+            " ".join(mapping[sentence] for sentence in sentences) if sentences else text
+            for text, sentences in zip(texts, sentences_per_text)
+        ]
+
+    def _correct_cached(self, texts: List[str], num_beams: Optional[int] = None) -> List[str]:
+        """Look texts up in the L0 and Redis caches; only the misses go to the model, as one batched call"""
+        num_beams = num_beams or settings.MODEL_NUM_BEAMS
+        if not self.model or not (settings.ENABLE_CACHING and settings.ENABLE_MODEL_CACHING):
+            return self._correct_uncached(texts, num_beams)[0]
+
+        cache_manager = get_cache_manager()
+        results = {}
+        misses = []
+        for text in texts:
+            if not text.strip():
+                # Nothing to correct; keep blank inputs out of both cache tiers
+                results[text] = text.strip()
+                continue
+            cache_text = f"{self.model_version}:{num_beams}:{text}"
+            key = hashlib.blake2b(cache_text.encode('utf-8'), digest_size=16).digest()
+            corrected_text = self._correction_cache.get(key)
+            if corrected_text is None:
+                corrected_text = cache_manager.get_model_cache(cache_text)
+                if corrected_text is not None:
+                    self._correction_cache.set(key, corrected_text)
+            if corrected_text is None:
+                misses.append((text, cache_text, key))
+            else:
+                results[text] = corrected_text
 
-            # Return both the extracted text and the soup object for reconstruction
-            return extracted_text, soup
+        if misses:
+            corrected, failed = self._correct_uncached([text for text, _, _ in misses], num_beams)
+            for (text, cache_text, key), corrected_text, model_failed in zip(misses, corrected, failed):
+                # Rule-based output from a failed generation is served once but never cached,
+                # so the next request retries the model instead of reading back the fallback
+                if not model_failed:
+                    cache_manager.set_model_cache(cache_text, corrected_text)
+                    self._correction_cache.set(key, corrected_text)
+                results[text] = corrected_text
 
-        return None, None
+        return [results[text] for text in texts]
+
+    def _correct_uncached(self, texts: List[str], num_beams: int) -> Tuple[List[str], List[bool]]:
+        """
+        Correct grammar with improved fallback handling (greedy unless num_beams > 1).
+        Texts are sorted by length and generated in padded batches of MODEL_BATCH_SIZE.
 
-    def correct_grammar(self, text: str) -> str:
-        """Correct grammar with improved fallback handling"""
+        Returns:
+            Tuple of (corrected texts, per-text flags marking rule-based output from a failed generation)
+        """
         if not self.model or not self.tokenizer:
             logger.info("Model not available, using fallback correction")
-            return self._fallback_correction(text)
+            return [self._fallback_correction(text) for text in texts], [True] * len(texts)
 
-        try:
-            # Clean and prepare text for processing
-            text = text.strip()
-            if not text:
-                return text
-
-            # Use the exact same logic as googlecolab.py
-            device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            self.model.to(device)
-
-            # Tokenize the input text (exactly like googlecolab.py)
-            inputs = self.tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=128)
-            input_ids = inputs['input_ids'].to(device)
-            attention_mask = inputs['attention_mask'].to(device)
-
-            # Generate the corrected text (exactly like googlecolab.py)
-            with torch.no_grad():
-                generated_ids = self.model.generate(
-                    input_ids=input_ids,
-                    attention_mask=attention_mask,
-                    max_length=128,
-                    num_beams=5,  # Beam search for better quality
-                    early_stopping=True
-                )
+        # Clean and prepare text for processing
+        texts = [text.strip() for text in texts]
+        results = list(texts)
+        failed = [False] * len(texts)
+
+        # Similar lengths in a batch keep padding waste low
+        order = sorted((i for i, text in enumerate(texts) if text), key=lambda i: len(texts[i]))
 
-            # Decode the generated IDs to text
-            corrected_text = self.tokenizer.decode(generated_ids[0], skip_special_tokens=True)
-
-            # If result is empty, it's a model failure - use fallback
-            if not corrected_text or corrected_text.strip() == "":
-                logger.warning("Model returned empty result, using fallback correction")
-                return self._fallback_correction(text)
-
-            # Clean up the corrected text
-            corrected_text = corrected_text.strip()
-
-            # Check if the model actually made changes
-            if corrected_text == text:
-                logger.info("Model found no grammar errors, trying fallback correction")
-                # Try fallback correction to catch obvious errors the model missed
-                fallback_result = self._fallback_correction(text)
-                if fallback_result != text:
-                    logger.info(" Fallback correction applied: '%s...' -> '%s...'", text[:50], fallback_result[:50])
-                    return fallback_result
-                logger.info("No corrections needed - text is grammatically correct")
-                return text
-            logger.info(" Grammar correction applied: '%s...' -> '%s...'", text[:50], corrected_text[:50])
-            return corrected_text
-
-        except (RuntimeError, AttributeError, ValueError) as e:
-            logger.error("Grammar correction error: %s", e)
-            logger.info("Falling back to rule-based correction")
+        # Greedy decoding by default; beam search only when configured
+        beam_kwargs = {"early_stopping": True} if num_beams > 1 else {}
+
+        batch_size = max(1, settings.MODEL_BATCH_SIZE)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            batch_texts = [texts[i] for i in batch]
+            try:
+                inputs = self.tokenizer(batch_texts, return_tensors="pt", padding=True, truncation=True,
+                                        max_length=settings.MODEL_MAX_LENGTH, **self.tokenize_kwargs)
+
+                # Generate the corrected texts
+                with self._inference_slots, torch.inference_mode(), self._autocast():
+                    generated_ids = self.model.generate(
+                        input_ids=_to_device(inputs['input_ids']),
+                        attention_mask=_to_device(inputs['attention_mask']),
+                        max_length=settings.MODEL_MAX_LENGTH,
+                        num_beams=num_beams,
+                        do_sample=False,
+                        use_cache=True,
+                        **beam_kwargs,
+                        **self.generate_kwargs
+                    )
+
+                # Decode the generated IDs to text
+                decoded = self.tokenizer.batch_decode(generated_ids, skip_special_tokens=True)
+            except (RuntimeError, AttributeError, ValueError) as e:
+                logger.error("Grammar correction error: %s", e)
+                logger.info("Falling back to rule-based correction")
+                decoded = [""] * len(batch)
+
+            for i, corrected_text in zip(batch, decoded):
+                failed[i] = not corrected_text.strip()
+                results[i] = self._finalize_correction(texts[i], corrected_text)
+
+        return results, failed
+
+    def _finalize_correction(self, text: str, corrected_text: str) -> str:
+        """Clean up one model output, using rule-based fallback when the model failed or changed nothing"""
+        # If result is empty, it's a model failure - use fallback
+        if not corrected_text or corrected_text.strip() == "":
+            logger.warning("Model returned empty result, using fallback correction")
             return self._fallback_correction(text)
 
+        # Clean up the corrected text
+        corrected_text = corrected_text.strip()
+
+        # Check if the model actually made changes
+        if corrected_text == text:
+            logger.info("Model found no grammar errors, trying fallback correction")
+            # Try fallback correction to catch obvious errors the model missed
+            fallback_result = self._fallback_correction(text)
+            if fallback_result != text:
+                logger.info(" Fallback correction applied: '%s...' -> '%s...'", text[:50], fallback_result[:50])
+                return fallback_result
+            logger.info("No corrections needed - text is grammatically correct")
+            return text
+        logger.info(" Grammar correction applied: '%s...' -> '%s...'", text[:50], corrected_text[:50])
+        return corrected_text
+
+    def warmup(self):
+        """Run one generation with the serving settings so kernels and compiled graphs are ready"""
+        if not self.model or not self.tokenizer:
+            return
+        start_time = time.time()
+        if DEVICE.type == "cuda" and settings.MODEL_COMPILE_CUDA_GRAPHS and self.model_version.startswith("torch"):
+            self._compile_model()
+        self._correct_uncached(["This is a warm-up sentence."], settings.MODEL_NUM_BEAMS)
+        logger.info(" Model warm-up finished in %.2fs", time.time() - start_time)
+
+    def _compile_model(self):
+        """
+        Compile the model for CUDA graph replay and validate it with a real generation.
+        torch.compile is lazy, so failures only surface on the first generate; on failure
+        the eager forward and dynamic KV cache are restored.
+        """
+        eager_forward = self.model.forward
+        try:
+            # reduce-overhead mode replays captured CUDA graphs; a static KV cache and
+            # bucketed input lengths keep the number of captured shapes small
+            self.model.forward = torch.compile(eager_forward, mode="reduce-overhead")
+        except (RuntimeError, AttributeError) as e:
+            logger.warning("torch.compile unavailable, using eager mode: %s", e)
+            return
+        self.generate_kwargs["cache_implementation"] = "static"
+        self.tokenize_kwargs["pad_to_multiple_of"] = settings.MODEL_PAD_BUCKET
+
+        _, failed = self._correct_uncached(["This is a warm-up sentence."], settings.MODEL_NUM_BEAMS)
+        if any(failed):
+            logger.warning("Compiled generation failed during warm-up, using eager mode")
+            self.model.forward = eager_forward
+            self.generate_kwargs.pop("cache_implementation", None)
+            self.tokenize_kwargs.pop("pad_to_multiple_of", None)
+            return
+        logger.info(" Model compiled with CUDA graphs (static KV cache)")
+
     def _fallback_correction(self, text: str) -> str:
         """Enhanced fallback corrections for common errors and OCR mistakes"""
-        corrections = {
-            # Common spelling mistakes
-            r'\bgrammer\b': 'grammar',
-            r'\bteh\b': 'the',
-            r'\badn\b': 'and',
-            r'\bthier\b': 'their',
-            r'\brecieve\b': 'receive',
-            r'\boccured\b': 'occurred',
-            r'\bseperate\b': 'separate',
-            r'\bdefinately\b': 'definitely',
-
-            # Contractions
-            r'\bdont\b': "don't",
-            r'\bwont\b': "won't",
-            r'\bcant\b': "can't",
-            r'\bdoesnt\b': "doesn't",
-            r'\bdidnt\b': "didn't",
-            r'\bhavent\b': "haven't",
-            r'\bhasnt\b': "hasn't",
-            r'\bhadnt\b': "hadn't",
-            r'\bisnt\b': "isn't",
-            r'\bwasnt\b': "wasn't",
-            r'\bwerent\b': "weren't",
-            r'\bwouldnt\b': "wouldn't",
-            r'\bcouldnt\b': "couldn't",
-            r'\bshouldnt\b': "shouldn't",
-
-            # OCR common mistakes (letter confusions)
-            r'\b0\b': 'O',  # Zero confused with letter O
-            r'\bl\b(?=[A-Z])': 'I',  # lowercase L confused with I
-            r'\brn\b': 'm',  # rn confused with m
-            r'\bvv\b': 'w',  # vv confused with w
-        }
-
         corrected_text = text
         corrections_made = 0
 
-        for pattern, replacement in corrections.items():
-            new_text = re.sub(pattern, replacement, corrected_text, flags=re.IGNORECASE)
+        for pattern, replacement in _FALLBACK_RULES:
+            new_text = pattern.sub(replacement, corrected_text)
             if new_text != corrected_text:
                 corrections_made += 1
             corrected_text = new_text
@@ -311,214 +900,68 @@ class GrammarCorrectionProcessor:
 
     def identify_corrections(self, original_text: str, corrected_text: str, context_words: int = 3) -> List[Dict[str, str]]:
         """
-        Compares original and corrected text to identify changed words using sequence matching.
-        Matches googlecolab.py exactly.
+        Compares original and corrected text to identify changed words.
+        Words are aligned with a Myers diff; replaced words are paired in order within each hunk.
         """
-        from difflib import Differ
-
         # Quick check: if texts are identical, no corrections needed
         if original_text.strip() == corrected_text.strip():
             logger.info("No corrections needed - texts are identical")
             return []
 
         # Tokenize including punctuation as separate tokens (exactly like googlecolab.py)
-        original_tokens_with_sep = re.findall(r'(\b\w+\b|\W+)', original_text)
-        corrected_tokens_with_sep = re.findall(r'(\b\w+\b|\W+)', corrected_text)
+        original_tokens_with_sep = _TOKEN_RE.findall(original_text)
+        corrected_tokens_with_sep = _TOKEN_RE.findall(corrected_text)
 
         # Create lists of only words for diffing
-        original_words = [token.lower() for token in original_tokens_with_sep if re.fullmatch(r'\b\w+\b', token)]
-        corrected_words = [token.lower() for token in corrected_tokens_with_sep if re.fullmatch(r'\b\w+\b', token)]
-
-        differ = Differ()
-        # Diff based on words only for identifying changes
-        diff = list(differ.compare(original_words, corrected_words))
+        original_words = [token.lower() for token in original_tokens_with_sep if _is_word(token)]
+        corrected_words = [token.lower() for token in corrected_tokens_with_sep if _is_word(token)]
 
         corrections = []
-        original_buffer = []
-        corrected_buffer = []
-
-        # Keep track of the index in the original_words and corrected_words lists
-        original_word_index = 0
-        corrected_word_index = 0
+        for a_start, a_end, b_start, b_end in _diff_hunks(original_words, corrected_words):
+            # Pure insertions/deletions are not reported, only replaced words
+            pairs = _pair_hunk_words(original_words[a_start:a_end], corrected_words[b_start:b_end])
+            for a_offset, b_offset in pairs:
+                i = a_start + a_offset
+                j = b_start + b_offset
+                orig = original_words[i]
+                corr = corrected_words[j]
+
+                # Cheap filter first: contexts are only built for words that actually changed
+                if orig == corr:
+                    continue
 
-        for item in diff:
-            code = item[0]
-            token = item[2:]  # This is a word from original_words or corrected_words
+                # Words never contain spaces, so comparing the windows equals comparing the joined contexts
+                original_window = original_words[max(0, i - context_words):i + 1 + context_words]
+                corrected_window = corrected_words[max(0, j - context_words):j + 1 + context_words]
+                if original_window == corrected_window:
+                    continue
 
-            if code == '?':
-                # Skip difference markers
-                continue
+                corrections.append({
+                    'original_word': orig,
+                    'corrected_word': corr,
+                    'original_context': " ".join(original_window),
+                    'corrected_context': " ".join(corrected_window)
+                })
 
-            if code == '-':
-                original_buffer.append(token)
-                original_word_index += 1
-            elif code == '+':
-                corrected_buffer.append(token)
-                corrected_word_index += 1
-            elif code == ' ':
-                # If tokens are the same, process any buffered changes before this
-                while original_buffer or corrected_buffer:
-                    orig = original_buffer.pop(0) if original_buffer else ''
-                    corr = corrected_buffer.pop(0) if corrected_buffer else ''
-
-                    # Only add to corrections if there's a change or non-empty insertion/deletion
-                    if orig != corr or (orig == '' and corr != '') or (orig != '' and corr == ''):
-                        # Find the index of the original word in the original_words list
-                        try:
-                            if orig:
-                                # Find the index of the *last* occurrence of the original word in the original_words list before the current index
-                                orig_index_in_words = original_word_index - len(original_buffer) - 1 if original_buffer else original_word_index - 1
-                                orig_index_in_words = max(0, orig_index_in_words)
-
-                                # Get original context words
-                                original_context_start = max(0, orig_index_in_words - context_words)
-                                original_context_end = min(len(original_words), orig_index_in_words + len([orig]) + context_words)
-                                original_context = " ".join(original_words[original_context_start:original_context_end])
-                            else:
-                                # For insertions, context is based on the corrected text position
-                                corr_index_in_words = corrected_word_index - len(corrected_buffer) - 1 if corrected_buffer else corrected_word_index - 1
-                                corr_index_in_words = max(0, corr_index_in_words)
-
-                                corrected_context_start = max(0, corr_index_in_words - context_words)
-                                corrected_context_end = min(len(corrected_words), corr_index_in_words + len([corr]) + context_words)
-                                original_context = " ".join(corrected_words[corrected_context_start:corrected_context_end])
-                        except (IndexError, ValueError) as e:
-                            logger.error("Error getting original context for %s: %s", orig, e)
-                            original_context = ""
-
-                        # Get corrected context words
-                        try:
-                            if corr:
-                                corr_index_in_words = corrected_word_index - len(corrected_buffer) - 1 if corrected_buffer else corrected_word_index - 1
-                                corr_index_in_words = max(0, corr_index_in_words)
-
-                                corrected_context_start = max(0, corr_index_in_words - context_words)
-                                corrected_context_end = min(len(corrected_words), corr_index_in_words + len([corr]) + context_words)
-                                corrected_context = " ".join(corrected_words[corrected_context_start:corrected_context_end])
-                            else:
-                                # For deletions, context is based on the original text position
-                                orig_index_in_words = original_word_index - len(original_buffer) - 1 if original_buffer else original_word_index - 1
-                                orig_index_in_words = max(0, orig_index_in_words)
-
-                                original_context_start = max(0, orig_index_in_words - context_words)
-                                original_context_end = min(len(original_words), orig_index_in_words + len([orig]) + context_words)
-                                corrected_context = " ".join(original_words[original_context_start:original_context_end])
-                        except (IndexError, ValueError) as e:
-                            logger.error("Error getting corrected context for %s: %s", corr, e)
-                            corrected_context = ""
-
-                        # Only add meaningful corrections (filter out empty or unchanged corrections)
-                        if (orig.strip() != corr.strip() and
-                            (orig.strip() != '' or corr.strip() != '') and
-                            original_context.strip() != corrected_context.strip()):
-                            corrections.append({
-                                'original_word': orig.strip(),
-                                'corrected_word': corr.strip(),
-                                'original_context': original_context,
-                                'corrected_context': corrected_context
-                            })
-
-                # Move indices forward for the matched token
-                original_word_index += 1
-                corrected_word_index += 1
-                # Reset buffers
-                original_buffer = []
-                corrected_buffer = []
-
-        # Process any remaining buffered changes at the end
-        while original_buffer or corrected_buffer:
-            orig = original_buffer.pop(0) if original_buffer else ''
-            corr = corrected_buffer.pop(0) if corrected_buffer else ''
-
-            if orig != corr or (orig == '' and corr != '') or (orig != '' and corr == ''):
-                try:
-                    if orig:
-                        orig_index_in_words = original_word_index - len(original_buffer) - 1 if original_buffer else original_word_index - 1
-                        orig_index_in_words = max(0, orig_index_in_words)
-
-                        original_context_start = max(0, orig_index_in_words - context_words)
-                        original_context_end = min(len(original_words), orig_index_in_words + len([orig]) + context_words)
-                        original_context = " ".join(original_words[original_context_start:original_context_end])
-                    else:
-                        corr_index_in_words = corrected_word_index - len(corrected_buffer) - 1 if corrected_buffer else corrected_word_index - 1
-                        corr_index_in_words = max(0, corr_index_in_words)
-
-                        corrected_context_start = max(0, corr_index_in_words - context_words)
-                        corrected_context_end = min(len(corrected_words), corr_index_in_words + len([corr]) + context_words)
-                        original_context = " ".join(corrected_words[corrected_context_start:corrected_context_end])
-                except (IndexError, ValueError) as e:
-                    logger.error("Error getting original context for %s at end: %s", orig, e)
-                    original_context = ""
+        logger.info("Identified %d meaningful corrections", len(corrections))
 
-                try:
-                    if corr:
-                        corr_index_in_words = corrected_word_index - len(corrected_buffer) - 1 if corrected_buffer else corrected_word_index - 1
-                        corr_index_in_words = max(0, corr_index_in_words)
-
-                        corrected_context_start = max(0, corr_index_in_words - context_words)
-                        corrected_context_end = min(len(corrected_words), corr_index_in_words + len([corr]) + context_words)
-                        corrected_context = " ".join(corrected_words[corrected_context_start:corrected_context_end])
-                    else:
-                        orig_index_in_words = original_word_index - len(original_buffer) - 1 if original_buffer else original_word_index - 1
-                        orig_index_in_words = max(0, orig_index_in_words)
-
-                        original_context_start = max(0, orig_index_in_words - context_words)
-                        original_context_end = min(len(original_words), orig_index_in_words + len([orig]) + context_words)
-                        corrected_context = " ".join(original_words[original_context_start:original_context_end])
-                except (IndexError, ValueError) as e:
-                    logger.error("Error getting corrected context for %s at end: %s", corr, e)
-                    corrected_context = ""
-
-                # Only add meaningful corrections (filter out empty or unchanged corrections)
-                if (orig.strip() != corr.strip() and
-                    (orig.strip() != '' or corr.strip() != '') and
-                    original_context.strip() != corrected_context.strip()):
-                    corrections.append({
-                        'original_word': orig.strip(),
-                        'corrected_word': corr.strip(),
-                        'original_context': original_context,
-                        'corrected_context': corrected_context
-                    })
-
-        # Final filter: remove meaningless corrections for website display
-        cleaned_corrections = []
-        for corr_dict in corrections:
-            orig_word = corr_dict['original_word']
-            corr_word = corr_dict['corrected_word']
-            orig_context = corr_dict['original_context']
-            corr_context = corr_dict['corrected_context']
-
-            # Only keep corrections that are meaningful for website display:
-            # 1. Words are actually different
-            # 2. At least one word is not empty
-            # 3. Contexts are different (indicating actual change)
-            # 4. Both words are not empty (avoid empty corrections)
-            if (orig_word != corr_word and
-                (orig_word != '' or corr_word != '') and
-                orig_context != corr_context and
-                orig_word.strip() != '' and corr_word.strip() != ''):
-                cleaned_corrections.append(corr_dict)
-
-        logger.info("Filtered corrections: %d -> %d meaningful corrections", len(corrections), len(cleaned_corrections))
-
-        return cleaned_corrections
+        return corrections
 
     def reconstruct_with_highlighting(self, original_content: Any, input_type: str, corrected_text: str, corrections: List[Dict], original_ocr_results: Optional[List] = None) -> Optional[Any]:
         """
         Reconstructs the original content with highlighted corrections at the word level.
         Uses regex-based word matching for better accuracy (from googlecolab.py).
         """
-        # Explicitly handle the case where no corrections are found
-        if not corrections and input_type == 'image':
-            logger.info("No corrections identified for image. Returning original image.")
+        # Nothing to highlight: return the original without walking the DOM or the OCR boxes
+        if not corrections:
+            logger.info("No corrections identified for %s. Returning original content.", input_type)
+            if input_type != 'image':
+                return original_content
             try:
-                return Image.open(original_content).convert("RGB")
+                return self._to_pil_image(original_content)
             except (OSError, IOError) as e:
                 logger.error("Error loading original image for return: %s", e)
                 return None
-        if not corrections and input_type == 'html':
-            logger.info("No corrections identified for %s. Returning original content.", input_type)
-            return original_content
 
         # Proceed with highlighting only if corrections exist
         if input_type == 'image':
@@ -527,9 +970,8 @@ class GrammarCorrectionProcessor:
                 return None
 
             try:
-                # Load the original image using the path
-                img = Image.open(original_content).convert("RGB")
-                draw = ImageDraw.Draw(img)
+                # Word boxes (x1, y1, x2, y2) are collected first and drawn in one pass at the end
+                highlight_boxes = np.empty((0, 4))
 
                 # Create a set of original words that were corrected for quick lookup
                 original_corrected_words_set = {
@@ -538,43 +980,58 @@ class GrammarCorrectionProcessor:
                     if corr_dict['original_word'] != corr_dict['corrected_word']
                 }
 
+                # Whole-word patterns are compiled once, not once per text block
+                word_patterns = [
+                    re.compile(r'\b' + re.escape(original_word_lower) + r'\b')
+                    for original_word_lower in original_corrected_words_set
+                ]
+
                 # Set a confidence threshold for highlighting
                 confidence_threshold = 0.5
 
-                # Iterate through the EasyOCR results (text blocks)
-                for (bbox, text, confidence) in original_ocr_results:
-                    # Only consider highlighting if confidence is above threshold
-                    if confidence >= confidence_threshold:
-                        # Get the bounding box coordinates as integers
-                        x_coords = [int(p[0]) for p in bbox]
-                        y_coords = [int(p[1]) for p in bbox]
-                        x1, y1, x2, y2 = min(x_coords), min(y_coords), max(x_coords), max(y_coords)
-
-                        # Attempt word-level highlighting within the bounding box
-                        block_text = text  # Use the original text from OCR
-                        block_text_lower = block_text.lower()
-
-                        # Iterate through the original words that were corrected
-                        for original_word_lower in original_corrected_words_set:
-                            # Find all occurrences of the original word within the block text
-                            # Use regex to find whole words
-                            for match in re.finditer(r'\b' + re.escape(original_word_lower) + r'\b', block_text_lower):
-                                start_index = match.start()
-                                word_length = len(match.group(0))
-
-                                # Basic approximation for word position within the block
-                                block_width = x2 - x1
-                                char_width_approx = block_width / len(block_text) if len(block_text) > 0 else 0
-
-                                word_x1 = x1 + (start_index * char_width_approx)
-                                word_y1 = y1
-                                word_x2 = word_x1 + (word_length * char_width_approx)
-                                word_y2 = y2
-
-                                # Draw a highlight (red rectangle border) around the approximate word bounding box
-                                draw.rectangle([(word_x1, word_y1), (word_x2, word_y2)], outline='red', width=2)
-
-                return img  # Return the PIL Image object
+                # Structure-of-arrays view of the EasyOCR results (text blocks): one array per field,
+                # so box extents, character widths and the confidence filter are single vector ops
+                texts = [text for (_, text, _) in original_ocr_results]
+                confidences = np.asarray([conf for (_, _, conf) in original_ocr_results], dtype=np.float64)
+                corners = np.asarray([bbox for (bbox, _, _) in original_ocr_results], dtype=np.float64)
+                corners = corners.reshape(len(texts), 4, 2).astype(np.int64)
+                x1s, y1s = corners[:, :, 0].min(axis=1), corners[:, :, 1].min(axis=1)
+                x2s, y2s = corners[:, :, 0].max(axis=1), corners[:, :, 1].max(axis=1)
+
+                # Basic approximation for word position within each block
+                text_lengths = np.fromiter(map(len, texts), dtype=np.float64, count=len(texts))
+                char_widths = np.divide(x2s - x1s, text_lengths, out=np.zeros(len(texts)), where=text_lengths > 0)
+
+                # (block index, start, length) of every corrected word found in a confident block
+                match_blocks, match_starts, match_lengths = [], [], []
+                for i in np.flatnonzero(confidences >= confidence_threshold).tolist():
+                    # Attempt word-level highlighting within the bounding box
+                    block_text_lower = texts[i].lower()
+
+                    # Iterate through the original words that were corrected
+                    for word_pattern in word_patterns:
+                        # Find all occurrences of the original word within the block text
+                        for match in word_pattern.finditer(block_text_lower):
+                            match_blocks.append(i)
+                            match_starts.append(match.start())
+                            match_lengths.append(match.end() - match.start())
+
+                if match_blocks:
+                    blocks = np.asarray(match_blocks)
+                    word_x1 = x1s[blocks] + np.asarray(match_starts) * char_widths[blocks]
+                    word_x2 = word_x1 + np.asarray(match_lengths) * char_widths[blocks]
+                    highlight_boxes = np.stack([word_x1, y1s[blocks], word_x2, y2s[blocks]], axis=1)
+
+                # Reuse the already-decoded image instead of reading the file again
+                img_np = self._to_rgb_array(original_content)
+
+                # Draw a highlight (red rectangle border) around each approximate word bounding box
+                if highlight_boxes.size:
+                    coords = np.rint(highlight_boxes).astype(np.int32)
+                    for word_x1, word_y1, word_x2, word_y2 in coords.tolist():
+                        cv2.rectangle(img_np, (word_x1, word_y1), (word_x2, word_y2), (255, 0, 0), 2)
+
+                return Image.fromarray(img_np)  # Return the PIL Image object
 
             except (OSError, IOError, ValueError) as e:
                 logger.error("Error processing image for highlighting: %s", e)
@@ -582,12 +1039,13 @@ class GrammarCorrectionProcessor:
 
         if input_type == 'html':
             try:
-                # original_content is already a soup object from extract_text
+                # original_content is the HTML string from extract_text (or an already-parsed soup)
                 if hasattr(original_content, 'find_all'):
                     soup = original_content
                 else:
-                    soup = BeautifulSoup(original_content, 'html.parser')
-                text_nodes = soup.find_all(string=True)
+                    soup = BeautifulSoup(original_content, _HTML_PARSER)
+                # Highlight inside <body> only; the full tree is kept so the output is the whole document
+                text_nodes = (soup.body or soup).find_all(string=True)
 
                 original_corrected_words_set = {
                     corr_dict['original_word'].lower()
@@ -602,12 +1060,12 @@ class GrammarCorrectionProcessor:
                     if parent and parent.name in ['script', 'style']:
                         continue
 
-                    tokens_and_separators = re.findall(r'(\b\w+\b|\W+)', original_node_text)
+                    tokens_and_separators = _TOKEN_RE.findall(original_node_text)
 
                     new_content = []
                     modified = False
                     for item in tokens_and_separators:
-                        if re.fullmatch(r'\b\w+\b', item):
+                        if _is_word(item):
                             word_lower = item.lower()
                             if word_lower in original_corrected_words_set:
                                 new_content.append(f'<u>{item}</u>')
@@ -652,7 +1110,9 @@ class GrammarCorrectionProcessor:
                     # Convert image to base64 instead of saving to disk
                     buffered = BytesIO()
                     reconstructed_content.save(buffered, format="PNG")
-                    img_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
+                    # getbuffer() exposes the PNG bytes without the copy getvalue() makes
+                    with buffered.getbuffer() as png_view:
+                        img_base64 = b64encode(png_view).decode('ascii')
                     content_output = f"data:image/png;base64,{img_base64}"
                     logger.info("Image converted to base64 successfully")
                 except (OSError, IOError) as e:
@@ -660,21 +1120,18 @@ class GrammarCorrectionProcessor:
                     content_output = "Error converting image to base64"
 
         elif input_type == 'html':
-            if hasattr(reconstructed_content, 'prettify'):
+            if isinstance(reconstructed_content, str) or hasattr(reconstructed_content, 'prettify'):
                 # Convert to string and clean up excessive whitespace
                 html_string = str(reconstructed_content)
                 # Remove excessive newlines and tabs while preserving structure
-                import re
                 # Replace multiple consecutive whitespace with single space
-                html_string = re.sub(r'\s+', ' ', html_string)
+                html_string = _WHITESPACE_RE.sub(' ', html_string)
                 # Restore proper line breaks for HTML tags
-                html_string = re.sub(r'>\s*<', '><', html_string)
+                html_string = _BETWEEN_TAGS_RE.sub('><', html_string)
                 content_output = html_string
-            elif isinstance(reconstructed_content, str):
-                content_output = reconstructed_content
 
         try:
-            json_output_string = json.dumps(corrections, indent=4)
+            json_output_string = json_dumps(corrections)
         except (TypeError, ValueError) as e:
             logger.error("Error generating JSON: %s", e)
             json_output_string = "[]"
@@ -692,96 +1149,181 @@ class GrammarCorrectionProcessor:
         Returns:
             Dictionary with processing results
         """
-        start_time = time.time()
+        return self.process_inputs([input_source_path], output_dir)[0]
 
-        try:
-            # 1. Handle input
-            original_content, input_type = self.handle_input(input_source_path)
+    def process_inputs(self, input_source_paths: List[str], output_dir: str = "/tmp") -> List[Dict[str, Any]]:
+        """
+        Process several inputs (e.g. the files of a ZIP archive) with a single batched correction pass:
+        text is extracted from every file first, all lines go through the model together, and each
+        file is then reconstructed from its share of the corrected lines.
 
-            if original_content is None:
-                return {
-                    "success": False,
-                    "error": f"Failed to handle input: {input_type}",
-                    "input_type": input_type
-                }
+        Args:
+            input_source_paths: Paths to input files
+            output_dir: Output directory (unused, kept for compatibility)
 
-            # 2. Extract text
-            if input_type == 'image':
-                extracted_texts, original_ocr_results = self.extract_text(original_content, input_type)
-                text_to_correct = " ".join(extracted_texts) if extracted_texts else ""
-                original_content_for_reconstruct = original_content
-            elif input_type == 'html':
-                extracted_text, soup_object = self.extract_text(original_content, input_type)
-                text_to_correct = extracted_text if extracted_text else ""
-                original_ocr_results = None
-                original_content_for_reconstruct = soup_object  # Pass the soup object for reconstruction
+        Returns:
+            One result dictionary per input path, in order
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(input_source_paths)
+        pending = []
+
+        # 1-2. Handle input and extract text for every file
+        for index, input_source_path in enumerate(input_source_paths):
+            try:
+                prepared = self._prepare_input(input_source_path, time.time())
+            except (OSError, RuntimeError, ValueError) as e:
+                results[index] = self._process_error(e)
+                continue
+            if "result" in prepared:
+                results[index] = prepared["result"]
             else:
-                return {
+                pending.append((index, prepared))
+
+        # 3. Correct grammar line by line, every file in one batch so repeated lines are only corrected once
+        all_lines = [line for _, prepared in pending for line in prepared["lines"]]
+        try:
+            all_corrected = self.correct_grammar_batch(all_lines) if all_lines else []
+        except (OSError, RuntimeError, ValueError) as e:
+            for index, _ in pending:
+                results[index] = self._process_error(e)
+            return results
+
+        # 4-6. Identify corrections, reconstruct and generate output per file
+        offset = 0
+        for index, prepared in pending:
+            line_count = len(prepared["lines"])
+            corrected_lines = all_corrected[offset:offset + line_count]
+            offset += line_count
+            try:
+                result = self._finish_input(prepared, corrected_lines, output_dir)
+            except (OSError, RuntimeError, ValueError) as e:
+                result = self._process_error(e)
+            results[index] = result
+
+        return results
+
+    def _process_error(self, error: Exception) -> Dict[str, Any]:
+        """Result dictionary for an input that failed with an exception"""
+        logger.error("Error in process_input: %s", error, exc_info=True)
+        return {
+            "success": False,
+            "error": str(error),
+            "input_type": "unknown"
+        }
+
+    def _prepare_input(self, input_source_path: str, start_time: float) -> Dict[str, Any]:
+        """
+        Handle input and extract its text. Returns the state needed to finish processing, with the
+        "lines" to correct, or {"result": ...} when the input is done already (error or no text).
+        """
+        # 1. Handle input
+        original_content, input_type = self.handle_input(input_source_path)
+
+        if original_content is None:
+            return {"result": {
+                "success": False,
+                "error": f"Failed to handle input: {input_type}",
+                "input_type": input_type
+            }}
+
+        # 2. Extract text
+        if input_type == 'image':
+            # Only the path is kept for highlighting: a batch of prepared inputs must not hold
+            # every decoded image at once, so _finish_input decodes it again
+            image = self._load_image(original_content)
+            if image is None:
+                return {"result": {
                     "success": False,
-                    "error": "Unsupported input type",
+                    "error": "Failed to decode image",
                     "input_type": input_type
-                }
+                }}
+            extracted_texts, original_ocr_results = self.extract_text(image, input_type)
+            text_to_correct = " ".join(extracted_texts) if extracted_texts else ""
+            lines = extracted_texts
+            original_content_for_reconstruct = original_content
+        elif input_type == 'html':
+            extracted_text, html_content = self.extract_text(original_content, input_type)
+            text_to_correct = extracted_text if extracted_text else ""
+            lines = text_to_correct.split("\n")
+            original_ocr_results = None
+            original_content_for_reconstruct = html_content  # Parsed into a soup only if there is something to highlight
+        else:
+            return {"result": {
+                "success": False,
+                "error": "Unsupported input type",
+                "input_type": input_type
+            }}
 
-            if not text_to_correct:
-                        return {
-                            "success": True,
-                            "input_type": input_type,
-                            "original_text": "",
-                            "corrected_text": "",
-                            "corrections": [],
-                            "corrections_count": 0,
-                            "output_file": None,
-                    "processing_time_seconds": time.time() - start_time
-                }
+        if not text_to_correct:
+            return {"result": {
+                "success": True,
+                "input_type": input_type,
+                "original_text": "",
+                "corrected_text": "",
+                "corrections": [],
+                "corrections_count": 0,
+                "output_file": None,
+                "processing_time_seconds": time.time() - start_time
+            }}
 
-            # 3. Correct grammar
-            corrected_text = self.correct_grammar(text_to_correct)
+        return {
+            "input_type": input_type,
+            "text_to_correct": text_to_correct,
+            "lines": lines,
+            "content": original_content_for_reconstruct,
+            "ocr_results": original_ocr_results,
+            "start_time": start_time
+        }
 
-            # 4. Identify corrections
-            if input_type == 'image':
-                original_text_for_comparison = " ".join(extracted_texts) if extracted_texts else ""
-            else:
-                original_text_for_comparison = extracted_text
+    def _finish_input(self, prepared: Dict[str, Any], corrected_lines: List[str], output_dir: str) -> Dict[str, Any]:
+        """Identify corrections, reconstruct with highlighting and generate output for a prepared input"""
+        input_type = prepared["input_type"]
+        text_to_correct = prepared["text_to_correct"]
+        # OCR fragments are joined with spaces, HTML blocks with newlines
+        corrected_text = (" " if input_type == 'image' else "\n").join(corrected_lines)
 
-            corrections = self.identify_corrections(original_text_for_comparison, corrected_text)
+        original_content = prepared["content"]
+        if input_type == 'image':
+            original_content = self._load_image(original_content)
+            if original_content is None:
+                return {
+                    "success": False,
+                    "error": "Failed to decode image",
+                    "input_type": input_type
+                }
 
-            # 5. Reconstruct with highlighting
-            reconstructed_content = self.reconstruct_with_highlighting(
-                original_content_for_reconstruct,
-                input_type,
-                corrected_text,
-                corrections,
-                original_ocr_results=original_ocr_results if input_type == 'image' else None
-            )
+        # 4. Identify corrections
+        corrections = self.identify_corrections(text_to_correct, corrected_text)
 
-            # 6. Generate output
-            content_output, json_output = self.generate_output(
-                reconstructed_content,
-                input_type,
-                corrections,
-                output_dir=output_dir
-            )
+        # 5. Reconstruct with highlighting (returns the original at once when there are no corrections)
+        reconstructed_content = self.reconstruct_with_highlighting(
+            original_content,
+            input_type,
+            corrected_text,
+            corrections,
+            original_ocr_results=prepared["ocr_results"]
+        )
 
-            processing_time = time.time() - start_time
+        # 6. Generate output
+        content_output, json_output = self.generate_output(
+            reconstructed_content,
+            input_type,
+            corrections,
+            output_dir=output_dir
+        )
 
-            return {
-                "success": True,
-                "input_type": input_type,
-                "original_text": text_to_correct,
-                "corrected_text": corrected_text,
-                "corrections": corrections,
-                "corrections_count": len(corrections),
-                "output_content": content_output,  # Contains base64 image or HTML string
-                "processing_time_seconds": round(processing_time, 2)
-            }
+        processing_time = time.time() - prepared["start_time"]
 
-        except (OSError, RuntimeError, ValueError) as e:
-            logger.error("Error in process_input: %s", e, exc_info=True)
-            return {
-                "success": False,
-                "error": str(e),
-                "input_type": "unknown"
-            }
+        return {
+            "success": True,
+            "input_type": input_type,
+            "original_text": text_to_correct,
+            "corrected_text": corrected_text,
+            "corrections": corrections,
+            "corrections_count": len(corrections),
+            "output_content": content_output,  # Contains base64 image or HTML string
+            "processing_time_seconds": round(processing_time, 2)
+        }
 
 
 # Global processor instance
@@ -276,6 +276,43 @@ def _load_without_sentencepiece(model_path: str) -> Tuple[Optional[Any], Optiona
     return None, None
 
 
+def load_onnx_model(model_path: str, onnx_path: str, use_cuda: bool = False) -> Tuple[Optional[Any], Optional[Any]]:
+    """
+    Load the model through ONNX Runtime (optimum), exporting it to onnx_path on first use.
+    Returns (None, None) when optimum/onnxruntime are not installed or loading fails.
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        from transformers import T5Tokenizer
+    except ImportError as e:
+        logger.warning("ONNX Runtime backend not available: %s", e)
+        return None, None
+
+    provider = "CUDAExecutionProvider" if use_cuda else "CPUExecutionProvider"
+    try:
+        if not os.path.exists(onnx_path):
+            logger.info("Exporting %s to ONNX at %s (one-time)...", model_path, onnx_path)
+            ort_model = ORTModelForSeq2SeqLM.from_pretrained(model_path, export=True)
+            ort_model.save_pretrained(onnx_path)
+
+        model = ORTModelForSeq2SeqLM.from_pretrained(onnx_path, provider=provider)
+        tokenizer = T5Tokenizer.from_pretrained(
+            model_path,
+            legacy=False,
+            use_fast=False,
+            clean_up_tokenization_spaces=True
+        )
+    except (OSError, RuntimeError, ValueError) as e:
+        logger.warning("ONNX model loading failed: %s", e)
+        return None, None
+
+    if _test_model_inference(model, tokenizer):
+        logger.info(" ONNX Runtime model loaded (%s)", provider)
+        return model, tokenizer
+
+    return None, None
+
+
 def _test_model_inference(model, tokenizer) -> bool:
     """Test if model and tokenizer work together"""
     try:
@@ -5,6 +5,7 @@ import hashlib
 import json
 import logging
 import os
+import tempfile
 import time
 from typing import Optional
 
@@ -12,11 +13,24 @@ import redis
 
 from app.config import settings
 
+try:
+    import orjson
+except ImportError:  # Optional: stdlib json is used when orjson is not installed
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 # Redis connection
 redis_client = None
 
+# Leading signatures of the upload types the service accepts
+_MAGIC_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image"),
+    (b"\xff\xd8\xff", "image"),
+    (b"PK\x03\x04", "archive"),
+    (b"PK\x05\x06", "archive"),  # Empty ZIP archive
+)
+
 
 def get_redis_client():
     """Get Redis client instance - uses fakeredis as fallback for Windows"""
@@ -50,6 +64,34 @@ def get_redis_client():
     return redis_client
 
 
+def json_dumps(obj) -> str:
+    """Serialize obj to a compact JSON string, using orjson when available"""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS matches json.dumps, which accepts int/float/bool keys
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def json_loads(data):
+    """Parse a JSON str/bytes, using orjson when available (its errors subclass json.JSONDecodeError)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def detect_file_type(header: bytes) -> str:
+    """Classify an upload as "image" or "archive" from its magic signature, otherwise "html"
+
+    HTML has no fixed signature (fragments, empty files and BOM-less UTF-16 are all valid
+    uploads, and handle_input decodes them), so any content that is not a known binary
+    format is treated as HTML.
+    """
+    for signature, file_type in _MAGIC_SIGNATURES:
+        if header.startswith(signature):
+            return file_type
+    return "html"
+
+
 def compute_file_hash(file_path: str) -> str:
     """Compute SHA256 hash of a file"""
     sha256_hash = hashlib.sha256()
@@ -72,7 +114,7 @@ def get_cached_result(file_hash: str) -> Optional[dict]:
         cached = client.get(f"result:{file_hash}")
         if cached:
             logger.info("Cache hit for hash: %s", file_hash)
-            return json.loads(cached)
+            return json_loads(cached)
     except (redis.RedisError, json.JSONDecodeError) as e:
         logger.error("Error getting cached result: %s", e)
 
@@ -92,7 +134,7 @@ def set_cached_result(file_hash: str, result: dict):
         client.setex(
             f"result:{file_hash}",
             settings.CACHE_TTL,
-            json.dumps(result)
+            json_dumps(result)
         )
         logger.info("Cached result for hash: %s", file_hash)
     except (redis.RedisError, TypeError) as e:
@@ -114,12 +156,9 @@ def create_directories():
         except OSError as e:
             logger.error("Error creating directory %s: %s", directory, e)
 
-def save_uploaded_file(file_content: bytes, filename: str, upload_dir: str = "/tmp/uploads") -> str:
-    """Save uploaded file and return path"""
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate unique filename
-    file_hash = hashlib.md5(file_content).hexdigest()[:8]
+
+def _upload_path(filename: str, file_hash: str, upload_dir: str) -> str:
+    """Unique, sanitized path for an upload from its original name and content hash"""
     base_name, ext = os.path.splitext(filename)
     
     # Limit base_name length to prevent filesystem issues
@@ -135,15 +174,58 @@ def save_uploaded_file(file_content: bytes, filename: str, upload_dir: str = "/t
     if not base_name:
         base_name = "file"
     
-    unique_filename = f"{base_name}_{file_hash}{ext}"
+    unique_filename = f"{base_name}_{file_hash[:8]}{ext}"
+    
+    return os.path.join(upload_dir, unique_filename)
+
+
+class UploadWriter:
+    """
+    Stream an upload straight into upload_dir while hashing it, so the body is written once
+    and never buffered elsewhere. commit() renames it to a sanitized name carrying the content
+    hash; an upload that is not committed (e.g. rejected mid-stream) is deleted on exit.
+    """
     
-    file_path = os.path.join(upload_dir, unique_filename)
+    def __init__(self, upload_dir: str = "/tmp/uploads"):
+        # Not memoized: a tmp cleaner may remove the directory while the process runs
+        os.makedirs(upload_dir, exist_ok=True)
+        self.upload_dir = upload_dir
+        self.size = 0
+        self._md5_hash = hashlib.md5()
+        fd, self._temp_path = tempfile.mkstemp(dir=upload_dir, suffix=".part")
+        self._file = os.fdopen(fd, 'wb')
+        self._committed = False
+    
+    def write(self, chunk: bytes):
+        """Append a chunk of the upload"""
+        self._md5_hash.update(chunk)
+        self._file.write(chunk)
+        self.size += len(chunk)
+    
+    def commit(self, filename: str) -> str:
+        """Finish the upload and return its final path"""
+        self._file.close()
+        file_path = _upload_path(filename, self._md5_hash.hexdigest(), self.upload_dir)
+        os.replace(self._temp_path, file_path)
+        self._committed = True
+        logger.info("Saved uploaded file to: %s", file_path)
+        return file_path
+    
+    def close(self):
+        """Close the file, deleting it unless the upload was committed"""
+        self._file.close()
+        if not self._committed:
+            try:
+                os.remove(self._temp_path)
+            except OSError as e:
+                logger.error("Error removing partial upload %s: %s", self._temp_path, e)
     
-    with open(file_path, 'wb') as f:
-        f.write(file_content)
+    def __enter__(self):
+        return self
     
-    logger.info("Saved uploaded file to: %s", file_path)
-    return file_path
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
 
 
 def cleanup_old_files(directory: str, max_age_seconds: int = 3600):
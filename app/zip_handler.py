@@ -2,31 +2,112 @@
 ZIP Archive Handler
 Handles extraction and processing of ZIP files containing images and HTML documents
 """
+import mmap
 import os
+import re
+import struct
 import zipfile
+import zlib
 import tempfile
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Tuple
 from pathlib import Path
 
 from app.config import settings
 
+try:
+    from deflate import DeflateError, deflate_decompress
+except ImportError:  # Optional libdeflate binding; zlib is used otherwise
+    DeflateError = zlib.error
+    deflate_decompress = None
+
 logger = logging.getLogger(__name__)
 
+# Hidden files/directories (any path component starting with ".", other than the "." and ".."
+# components _member_path drops) and macOS resource forks; backslashes separate components like "/"
+_SKIPPED_MEMBER_PATTERN = r'(?:^|[/\\])(?:\.(?!\.?(?:[/\\]|$))|__MACOSX[/\\])'
+
+# Members smaller than this are exempt from the compression ratio check (small text compresses well)
+_RATIO_CHECK_MIN_SIZE = 1024 * 1024
+
+# Threads inflating/writing members concurrently (zlib and file I/O release the GIL)
+_EXTRACT_WORKERS = min(8, os.cpu_count() or 1)
+
+# Local file header: signature, versions/flags/method/time/date/crc/sizes, then name and extra lengths
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+def _inflate(raw: bytes, uncompressed_size: int) -> bytes:
+    """Inflate a raw DEFLATE stream whose uncompressed size is known from the central directory"""
+    if deflate_decompress is not None:
+        # libdeflate decodes the whole buffer in one call into a buffer of exactly this size
+        return deflate_decompress(raw, uncompressed_size)
+    # max_length caps the output, so a member lying about its size cannot inflate without bound
+    return zlib.decompressobj(-zlib.MAX_WBITS).decompress(raw, uncompressed_size + 1)
+
+
+def _read_member(zip_ref: zipfile.ZipFile, zip_buffer: mmap.mmap, file_info: zipfile.ZipInfo) -> bytes:
+    """
+    Read one member's bytes by slicing its compressed data straight out of the mapped archive,
+    instead of going through ZipFile.open()'s streaming reader. Encrypted members and
+    methods other than stored/deflated fall back to zipfile.
+    """
+    if file_info.flag_bits & 0x1 or file_info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        return zip_ref.read(file_info)
+
+    try:
+        signature, name_length, extra_length = _LOCAL_HEADER.unpack_from(zip_buffer, file_info.header_offset)
+    except struct.error as e:
+        raise zipfile.BadZipFile(f"Truncated local file header for {file_info.filename}") from e
+    if signature != _LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f"Bad local file header for {file_info.filename}")
+    data_start = file_info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+    raw = zip_buffer[data_start:data_start + file_info.compress_size]
+    if len(raw) != file_info.compress_size:
+        raise zipfile.BadZipFile(f"Truncated compressed data for {file_info.filename}")
+
+    if file_info.compress_type == zipfile.ZIP_STORED:
+        data = raw
+    else:
+        try:
+            data = _inflate(raw, file_info.file_size)
+        except (zlib.error, DeflateError) as e:
+            raise zipfile.BadZipFile(f"Bad compressed data for {file_info.filename}: {e}") from e
+
+    if len(data) != file_info.file_size or zlib.crc32(data) != file_info.CRC:
+        raise zipfile.BadZipFile(f"Bad CRC-32 or size for {file_info.filename}")
+    return data
+
+
+def _member_path(extract_dir: str, filename: str) -> str:
+    """Destination path for an archive member, confined to extract_dir like ZipFile.extract()"""
+    parts = [
+        part for part in filename.replace("\\", "/").split("/")
+        if part not in ("", ".", "..")
+    ]
+    # Drop drive letters ("C:") so absolute Windows names cannot escape either
+    parts = [os.path.splitdrive(part)[1] or "_" for part in parts]
+    return os.path.join(extract_dir, *parts)
+
 
 class ZipHandler:
     """Handles ZIP file extraction and validation"""
     
     def __init__(self):
-        self.allowed_extensions = (
-            settings.ALLOWED_IMAGE_EXTENSIONS + 
-            settings.ALLOWED_HTML_EXTENSIONS
+        # Frozen set so the per-entry extension check is a single hash lookup
+        self.allowed_extensions = frozenset(
+            ext.lower() for ext in
+            settings.ALLOWED_IMAGE_EXTENSIONS + settings.ALLOWED_HTML_EXTENSIONS
+        )
+        # One compiled pattern classifies a member name in a single match: not hidden,
+        # not a macOS resource fork, and ending in an allowed extension
+        extension_pattern = "|".join(re.escape(ext) for ext in sorted(self.allowed_extensions))
+        self.member_re = re.compile(
+            rf'(?!.*{_SKIPPED_MEMBER_PATTERN}).*(?:{extension_pattern})\Z',
+            re.IGNORECASE | re.DOTALL
         )
-    
-    def is_valid_file(self, filename: str) -> bool:
-        """Check if file has valid extension"""
-        ext = os.path.splitext(filename)[1].lower()
-        return ext in self.allowed_extensions
     
     def extract_and_validate(self, zip_path: str, extract_dir: str) -> Tuple[List[str], Dict[str, Any]]:
         """
@@ -49,13 +130,31 @@ class ZipHandler:
             if not zipfile.is_zipfile(zip_path):
                 raise ValueError("Invalid ZIP file")
             
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            # zipfile only parses the central directory; member data is sliced from a read-only
+            # mapping, so just the members actually extracted are paged in, without read() copies
+            with open(zip_path, 'rb') as zip_file, \
+                    mmap.mmap(zip_file.fileno(), 0, access=mmap.ACCESS_READ) as zip_buffer, \
+                    zipfile.ZipFile(zip_path, 'r') as zip_ref:
                 # Get file list
-                file_list = zip_ref.namelist()
-                metadata["total_files"] = len(file_list)
+                file_infos = zip_ref.infolist()
+                metadata["total_files"] = len(file_infos)
+                
+                # Check for zip bombs from the central directory alone, before anything is inflated
+                if len(file_infos) > settings.MAX_ZIP_ENTRIES:
+                    raise ValueError(
+                        f"ZIP file has too many entries: {len(file_infos)} (max: {settings.MAX_ZIP_ENTRIES})"
+                    )
                 
-                # Check for zip bombs (files that expand too much)
-                total_uncompressed_size = sum(info.file_size for info in zip_ref.infolist())
+                total_uncompressed_size = 0
+                for info in file_infos:
+                    total_uncompressed_size += info.file_size
+                    if (info.file_size >= _RATIO_CHECK_MIN_SIZE and
+                            info.file_size > info.compress_size * settings.MAX_ZIP_COMPRESSION_RATIO):
+                        raise ValueError(
+                            f"ZIP entry {info.filename} expands too much: "
+                            f"{info.file_size} bytes from {info.compress_size} compressed "
+                            f"(max ratio: {settings.MAX_ZIP_COMPRESSION_RATIO:g})"
+                        )
                 
                 if total_uncompressed_size > settings.MAX_ZIP_EXTRACT_SIZE:
                     raise ValueError(
@@ -65,42 +164,66 @@ class ZipHandler:
                 
                 metadata["total_size"] = total_uncompressed_size
                 
-                # Extract valid files
-                for file_info in zip_ref.infolist():
+                # Select valid files first, keyed by destination path; members are then independent,
+                # so they are extracted in parallel
+                selected = {}
+                for file_info in file_infos:
                     # Skip directories
                     if file_info.is_dir():
                         continue
                     
                     filename = file_info.filename
                     
-                    # Skip hidden files and system files
-                    if os.path.basename(filename).startswith('.') or '__MACOSX' in filename:
+                    # Skip hidden, system and unsupported files (name check only; nothing is read or inflated)
+                    if not self.member_re.match(filename):
+                        logger.debug("Skipping file: %s", filename)
                         metadata["skipped_files"] += 1
                         continue
                     
-                    # Check if file type is allowed
-                    if not self.is_valid_file(filename):
-                        logger.debug("Skipping unsupported file: %s", filename)
+                    # Repeated names (or names that sanitize to the same path) would be written by two
+                    # threads at once; the later entry wins, as with sequential extraction
+                    extracted_path = _member_path(extract_dir, filename)
+                    if extracted_path in selected:
+                        logger.debug("Duplicate member path, keeping the later entry: %s", filename)
                         metadata["skipped_files"] += 1
+                        selected[extracted_path] = file_info
                         continue
                     
                     # Check file count limit
-                    if len(extracted_files) >= settings.MAX_FILES_IN_ZIP:
+                    if len(selected) >= settings.MAX_FILES_IN_ZIP:
                         logger.warning("Reached maximum file limit (%d)", settings.MAX_FILES_IN_ZIP)
                         metadata["errors"].append(f"Maximum file limit reached ({settings.MAX_FILES_IN_ZIP})")
                         break
                     
+                    selected[extracted_path] = file_info
+                
+                def extract_member(member: Tuple[str, zipfile.ZipInfo]):
+                    """Extract one member; returns its path, or the error so results stay in archive order"""
+                    extracted_path, file_info = member
                     try:
-                        # Extract file
-                        extracted_path = zip_ref.extract(file_info, extract_dir)
-                        extracted_files.append(extracted_path)
-                        metadata["valid_files"] += 1
-                        logger.info("Extracted: %s", filename)
-
+                        data = _read_member(zip_ref, zip_buffer, file_info)
+                        os.makedirs(os.path.dirname(extracted_path), exist_ok=True)
+                        with open(extracted_path, 'wb') as f:
+                            f.write(data)
+                        return extracted_path
                     except (OSError, zipfile.BadZipFile) as e:
-                        logger.error("Error extracting %s: %s", filename, e)
-                        metadata["errors"].append(f"Failed to extract {filename}: {str(e)}")
+                        return e
+                
+                members = list(selected.items())
+                if len(members) > 1 and _EXTRACT_WORKERS > 1:
+                    with ThreadPoolExecutor(max_workers=min(_EXTRACT_WORKERS, len(members))) as pool:
+                        outcomes = list(pool.map(extract_member, members))
+                else:
+                    outcomes = [extract_member(member) for member in members]
+                
+                for (_, file_info), outcome in zip(members, outcomes):
+                    if isinstance(outcome, Exception):
+                        logger.error("Error extracting %s: %s", file_info.filename, outcome)
+                        metadata["errors"].append(f"Failed to extract {file_info.filename}: {str(outcome)}")
                         continue
+                    extracted_files.append(outcome)
+                    metadata["valid_files"] += 1
+                    logger.info("Extracted: %s", file_info.filename)
                 
                 logger.info(
                     "ZIP extraction complete: %d valid files, %d skipped",
@@ -143,32 +266,18 @@ class ZipHandler:
                         "input_type": "zip"
                     }
                 
-                # Process each file
-                results = []
+                # Process all files together: their text goes through the grammar model as one batch
+                logger.info("Processing %d files from ZIP archive", len(extracted_files))
+                results = processor.process_inputs(extracted_files, output_dir=output_dir)
                 total_corrections = 0
                 
-                for file_path in extracted_files:
-                    try:
-                        logger.info("Processing: %s", os.path.basename(file_path))
-                        
-                        # Process individual file
-                        result = processor.process_input(file_path, output_dir=output_dir)
-                        
-                        # Add filename to result
-                        result["filename"] = os.path.basename(file_path)
-                        results.append(result)
-                        
-                        # Count corrections
-                        if result.get("success"):
-                            total_corrections += result.get("corrections_count", 0)
-                        
-                    except (OSError, RuntimeError, ValueError) as e:
-                        logger.error("Error processing %s: %s", file_path, e)
-                        results.append({
-                            "success": False,
-                            "filename": os.path.basename(file_path),
-                            "error": str(e)
-                        })
+                for file_path, result in zip(extracted_files, results):
+                    # Add filename to result
+                    result["filename"] = os.path.basename(file_path)
+                    
+                    # Count corrections
+                    if result.get("success"):
+                        total_corrections += result.get("corrections_count", 0)
                 
                 # Compile summary
                 successful = sum(1 for r in results if r.get("success"))
@@ -0,0 +1,77 @@
+"""
+Streaming HTML text extraction must select the same lines as the BeautifulSoup walk it replaced
+"""
+import pytest
+from bs4 import BeautifulSoup
+from bs4.element import PreformattedString
+
+from app import processor
+from app.processor import _HTML_BLOCK_TAGS, _HTML_INLINE_TAGS, _WHITESPACE_RE, _extract_html_text
+
+HTML_CASES = [
+    '<html><head><title>Doc</title></head><body><p>He go to school.</p><p>I dont like teh grammer.</p></body></html>',
+    # </head> is optional: the body must not be swallowed by the head
+    '<html><head><title>Doc</title>\n<body><p>He go to school.</p><p>I dont like teh grammer.</p></body></html>',
+    '<html><head><title>Doc</title><p>He go to school.</p>',
+    '<title>only title</title>',
+    # Text after a block closes inside an inline element
+    '<b>bold <p>para</p> tail</b>',
+    '<p>unclosed <b>bold <i>ital</p> after',
+    '<a href="#">link<div>block in a</div>more</a>',
+    '<body><noscript><p>Enable JS please</p></noscript><p>x</p></body>',
+    '<div><textarea>typed text</textarea> after</div>',
+    '<body><textarea>typed <b>x</b></textarea></body>',
+    '<ul><li>one<li>two &amp; three</ul><p>a<br>b<p>c',
+    '<div>Intro <span>tail</span> q<p>X <b>y</b> z</p></div><a href=#>link</a><!-- c --><script>var a</script>',
+    '<html><head><style>p{}</style><script>1<2</script></head><body><h1>T</h1><div><p>a<div>b</div>c</p></div></body></html>',
+    '<!DOCTYPE html><html><head><meta charset="utf-8"></head><body><p>&nbsp;A&lt;b&gt; &#169;</p></body></html>',
+    '<h2>H<span>s</span></h2><li>item<span>x</span></li><template><p>tpl</p></template>',
+    '<table><tr><td><p>cell</p></td></tr></table><span>s<div>d</div>e</span>',
+    '<p>a</p><body><p>b</p></body>',
+    '<html><body><p>x</p></body></html><p>after html</p>',
+    '<select><option>o1<option>o2</select><p>p</p>',
+    '<p>x</br>y</p><p/>z',
+    '',
+    'plain text only',
+    'Hello <b>x</b>',
+]
+
+
+def _soup_walk_text(content: str, parser: str) -> str:
+    """The BeautifulSoup extraction the streaming collector replaced"""
+    soup = BeautifulSoup(content, parser)
+    blocks = {}
+    for text_node in (soup.body or soup).find_all(string=True):
+        if isinstance(text_node, PreformattedString) or text_node.parent.name in ('script', 'style'):
+            continue
+        owner = None
+        for ancestor in text_node.parents:
+            if ancestor.name in _HTML_BLOCK_TAGS:
+                owner = ancestor
+                break
+            if ancestor.name in _HTML_INLINE_TAGS:
+                owner = ancestor
+        if owner is not None:
+            blocks.setdefault(id(owner), []).append(str(text_node))
+
+    parts = [text for text in (_WHITESPACE_RE.sub(' ', "".join(pieces)).strip() for pieces in blocks.values()) if text]
+    return "\n".join(parts) + "\n" if parts else soup.get_text()
+
+
+@pytest.mark.parametrize("content", HTML_CASES)
+def test_lxml_extraction_matches_soup_walk(content):
+    pytest.importorskip("lxml")
+    assert _extract_html_text(content) == _soup_walk_text(content, 'lxml')
+
+
+@pytest.mark.parametrize("content", HTML_CASES)
+def test_html_parser_extraction_matches_soup_walk(content, monkeypatch):
+    monkeypatch.setattr(processor, "etree", None)
+    monkeypatch.setattr(processor, "_HTML_PARSER", 'html.parser')
+    assert _extract_html_text(content) == _soup_walk_text(content, 'html.parser')
+
+
+def test_missing_head_end_tag_keeps_body_lines():
+    pytest.importorskip("lxml")
+    content = '<html><head><title>Doc</title>\n<body><p>He go to school.</p><p>I dont like teh grammer.</p></body></html>'
+    assert _extract_html_text(content) == "He go to school.\nI dont like teh grammer.\n"
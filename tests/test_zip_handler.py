@@ -0,0 +1,60 @@
+"""
+ZIP member selection and extraction
+"""
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from app.zip_handler import ZipHandler
+
+
+@pytest.mark.parametrize("filename", [
+    ".hidden.html",
+    "..dots.html",
+    "dir/..x.html",
+    "dir/.git/page.html",
+    "dir\\.hidden.html",
+    "__MACOSX/page.html",
+    "dir/__MACOSX/page.html",
+    "notes.txt",
+])
+def test_member_re_skips_hidden_and_unsupported(filename):
+    assert not ZipHandler().member_re.match(filename)
+
+
+@pytest.mark.parametrize("filename", ["page.html", "dir/page.HTM", "img/photo.jpg", "./page.html", "../page.png"])
+def test_member_re_accepts_supported(filename):
+    assert ZipHandler().member_re.match(filename)
+
+
+def test_extract_skips_hidden_members(tmp_path):
+    zip_path = tmp_path / "upload.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("page.html", "<p>visible</p>")
+        zf.writestr("..dots.html", "<p>hidden</p>")
+        zf.writestr("dir/..x.html", "<p>hidden</p>")
+
+    extracted, metadata = ZipHandler().extract_and_validate(str(zip_path), str(tmp_path / "out"))
+
+    assert [path.rsplit("/", 1)[-1] for path in extracted] == ["page.html"]
+    assert metadata["skipped_files"] == 2
+
+
+@pytest.mark.filterwarnings("ignore:Duplicate name")
+def test_extract_writes_each_destination_once(tmp_path):
+    zip_path = tmp_path / "upload.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("a/b.html", "<p>first</p>")
+        zf.writestr("other.html", "<p>other</p>")
+        zf.writestr("a\\b.html", "<p>second</p>")
+        zf.writestr("other.html", "<p>other again</p>")
+
+    extracted, metadata = ZipHandler().extract_and_validate(str(zip_path), str(tmp_path / "out"))
+
+    assert len(extracted) == len(set(extracted)) == 2
+    assert metadata["valid_files"] == 2
+    assert metadata["skipped_files"] == 2
+    # The later entry wins, as with sequential extraction
+    contents = {path.rsplit("/", 1)[-1]: Path(path).read_text(encoding="utf-8") for path in extracted}
+    assert contents == {"b.html": "<p>second</p>", "other.html": "<p>other again</p>"}